@@ -0,0 +1,292 @@
+import asyncio
+import contextlib
+import socket
+
+from solstis_tcpip.solstis_core import (
+    SolstisCore,
+    SolstisError,
+    _RECEIVE_BUFFER_SIZE,
+    _encode_command,
+    _loads,
+    _reply_op,
+    _wrap_numbers,
+)
+
+
+class AsyncSolstisCore(SolstisCore):
+    """SolstisCore on top of asyncio streams
+
+    Every command method (command, set_wave_m, poll_wave_m, ...) returns a coroutine
+    instead of the response, so several lasers can be polled from one event loop
+    without blocking a thread. Commands may also run concurrently on one connection,
+    replies are read by a background task and handed to the waiting command by
+    transmission id. The client works with the default event loop, and with uvloop
+    if it is installed via uvloop.install() before the loop is started.
+    """
+
+    __slots__ = ("_reader", "_reader_task", "_pending")
+
+    def __init__(self, server_ip, server_port):
+        super().__init__(server_ip, server_port)
+        self._reader = None
+        self._reader_task = None
+        self._pending = {}  # transmission id -> future of the reply
+
+    # Public methods to communicate with SolsTiS
+    async def connect(self, timeout=5.0):
+        self._rxlen = 0
+        self._unreaped = []
+        try:
+            self._reader, self.connection = await asyncio.wait_for(
+                asyncio.open_connection(self.server_ip, self.server_port), timeout
+            )
+        except asyncio.TimeoutError:
+            self._reader = self.connection = None
+            raise TimeoutError("Connection timed out")
+        except OSError as e:
+            self._reader = self.connection = None
+            raise ConnectionError(
+                f"Failed to connect to {self.server_ip}:{self.server_port}: {e}"
+            ) from e
+        # asyncio already disables Nagle on TCP streams
+        sock = self.connection.get_extra_info("socket")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._reader_task = asyncio.create_task(self._dispatch_replies())
+
+    async def send_command(self, transmission_id=1, op="start_link", params=None):
+        if self.connection is None:
+            raise SolstisError("Not connected to the server.", severity=10)
+
+        message_json = _encode_command(transmission_id, op, _wrap_numbers(params))
+        self.connection.write(message_json)
+        await self.connection.drain()
+
+    async def receive_response(self):
+        while True:
+            frame = self._take_frame()
+            if frame is not None:
+                return _loads(frame)
+            data = await self._reader.read(_RECEIVE_BUFFER_SIZE)
+            if not data:
+                raise SolstisError("Connection closed by the server.", severity=10)
+            end = self._rxlen + len(data)
+            while end > len(self._rxbuf):
+                self._grow_receive_buffer()
+            self._rxbuf[self._rxlen : end] = data
+            self._rxlen = end
+
+    async def disconnect(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        self._fail_pending(SolstisError("Disconnected from the server.", severity=10))
+        if self.connection is not None:
+            self.connection.close()
+            try:
+                await self.connection.wait_closed()
+            except OSError:
+                pass  # the server has already dropped the connection
+            self._reader = self.connection = None
+        self._rxlen = 0
+        # the commands sent with reap=False have failed with the pending futures above
+        unreaped, self._unreaped = self._unreaped, []
+        await asyncio.gather(*unreaped, return_exceptions=True)
+
+    # internal methods to hand replies to the waiting commands
+    async def _dispatch_replies(self):
+        try:
+            while True:
+                response = await self.receive_response()
+                msgID = response["message"]["transmission_id"][0]
+                future = self._pending.pop(msgID, None)
+                if future is None:
+                    # parse_fail or a reply nobody waits for, the stream is out of step
+                    self._verify_message(response)  # raises for a parse_fail reply
+                    raise SolstisError(
+                        f"Message with ID {msgID} did not match any expected ID.", 10
+                    )
+                if not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # the connection is unusable, every waiting command gets the error
+            self._fail_pending(e)
+
+    def _fail_pending(self, error):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _rpc(self, transmission_id, op, params=None):
+        if self._reader_task is None or self._reader_task.done():
+            raise SolstisError("Not connected to the server.", severity=10)
+        # the future is registered first, the reply may arrive while the command is drained
+        future = asyncio.get_running_loop().create_future()
+        self._pending[transmission_id] = future
+        try:
+            await self.send_command(transmission_id, op, params)
+        except BaseException:
+            self._pending.pop(transmission_id, None)
+            raise
+        response = await future
+        self._verify_message(
+            response, op=_reply_op(op), transmission_id=transmission_id
+        )
+        return response
+
+    # Public methods, generalized call for all commands
+    async def command(self, command_id, reap=True, **kwargs):
+        """
+        Parameters:
+        command_id: The ID of the command to execute, or its op name e.g. "set_wave_m".
+        reap: If False, the command is run in a background task and None is returned. The responses are
+            collected by drain().
+        kwargs: The parameters to pass to the command.
+
+        Returns:
+        The response from the Solstis device as a dictionary.
+        """
+        # the command is checked and gets its id before anything is awaited, like in SolstisCore
+        method = self._method_of(command_id, kwargs)
+        transmission_id = self._allocate_transmission_id()
+        if self._batch is not None:
+            self._batch.append(self._call(method, transmission_id, kwargs))
+            return None
+        if not reap:
+            self._unreaped.append(
+                asyncio.create_task(self._call(method, transmission_id, kwargs))
+            )
+            return None
+        return await self._call(method, transmission_id, kwargs)
+
+    async def _call(self, method, transmission_id, kwargs):
+        response = await method(self, transmission_id, **kwargs)
+        self._check_response(response)
+        return response
+
+    async def command_many(self, calls):
+        """
+        Parameters:
+        calls: A list of (command_id, kwargs) tuples, command_id may also be the op name, kwargs is a dictionary of the parameters of the command.
+            All the commands are written before any reply is awaited.
+
+        Returns:
+        The list of responses from the Solstis device, in the order of calls.
+        """
+        return await asyncio.gather(
+            *(self.command(command_id, **kwargs) for command_id, kwargs in calls)
+        )
+
+    async def drain(self):
+        """
+        Waits for the commands sent with reap=False.
+
+        Returns:
+        The list of responses from the Solstis device, in the order the commands were sent.
+        """
+        tasks, self._unreaped = self._unreaped, []
+        return await asyncio.gather(*tasks)
+
+    @contextlib.asynccontextmanager
+    async def batch(self):
+        """
+        Queues the commands awaited inside the async with block, they return None. All of them are sent
+        when the block exits and their replies are awaited together.
+
+        Returns:
+        A list that is filled with the responses from the Solstis device when the block exits, in the order
+        the commands were called. Nothing is sent if the block raises.
+        """
+        if self._batch is not None:
+            raise RuntimeError("batch() blocks cannot be nested.")
+        queued = self._batch = []
+        responses = []
+        try:
+            yield responses
+        except BaseException:
+            for call in queued:
+                call.close()
+            raise
+        finally:
+            self._batch = None
+        responses.extend(await asyncio.gather(*queued))
+
+    async def pipeline(self, calls):
+        """
+        Same as command_many, the commands are given by op name.
+
+        Parameters:
+        calls: A list of (op, params) tuples, params is a dictionary of the parameters of the command or None.
+
+        Returns:
+        The list of responses from the Solstis device, in the order of calls.
+        """
+        return await self.command_many([(op, params or {}) for op, params in calls])
+
+    async def poll_until(
+        self, command_id, predicate, interval=0.1, timeout=None, **kwargs
+    ):
+        """
+        Parameters:
+        command_id: The ID of the poll command to repeat, e.g. 6 for poll_move_wave_t.
+        predicate: Called with each response, polling stops once it returns True.
+            Replies reporting an operation in progress (severity 1) are polled again.
+        interval: The time in seconds to wait between two polls.
+        timeout: The time in seconds after which asyncio.TimeoutError is raised, None to wait forever.
+        kwargs: The parameters to pass to the command.
+
+        Returns:
+        The first response for which predicate returned True.
+        """
+
+        async def poll():
+            while True:
+                try:
+                    response = await self.command(command_id, **kwargs)
+                except SolstisError as e:
+                    if e.severity != 1:
+                        raise
+                else:
+                    if predicate(response):
+                        return response
+                await asyncio.sleep(interval)
+
+        return await asyncio.wait_for(poll(), timeout)
+
+    async def wait_move_wave_t(self, interval=0.1, timeout=None):
+        """
+        Parameters:
+        interval: The time in seconds to wait between two polls.
+        timeout: The time in seconds after which asyncio.TimeoutError is raised, None to wait forever.
+
+        Returns:
+        The poll_move_wave_t response once the tuning started by move_wave_t has completed.
+        """
+        return await self.poll_until(6, lambda response: True, interval, timeout)
+
+    async def settle_wavelength(
+        self, wavelength, tolerance, interval=0.1, timeout=None
+    ):
+        """
+        Parameters:
+        wavelength: The target wavelength value in nm, set with set_wave_m.
+        tolerance: The largest accepted difference in nm between the wavelength meter reading and the target.
+        interval: The time in seconds to wait between two polls.
+        timeout: The time in seconds after which asyncio.TimeoutError is raised, None to wait forever.
+
+        Returns:
+        The first poll_wave_m response whose current_wavelength is within tolerance of the target.
+        """
+
+        def settled(response):
+            current = response["message"]["parameters"]["current_wavelength"][0]
+            return abs(current - wavelength) <= tolerance
+
+        await self.set_wave_m(wavelength)
+        return await self.poll_until(2, settled, interval, timeout)
@@ -1,8 +1,7 @@
-from enum import Enum
-import pytest
+from enum import IntEnum
 
 
-class Scan_Type(Enum):
+class Scan_Type(IntEnum):
     """
     The scan type.
         “coarse” - BRF only, not currently available.
@@ -11,21 +10,14 @@ class Scan_Type(Enum):
         “line” - Line narrow scan, BRF + etalon + cavity tuning
     """
 
-    COURSE = 1
+    COARSE = 1
+    COURSE = 1  # deprecated misspelling, alias of COARSE
     MEDIUM = 2
     FINE = 3
     LINE = 4
 
-    @property
-    def lowercase_name(self):
-        return self.name.lower()
-
-    @classmethod
-    def has_value(cls, value):
-        return value in cls._value2member_map_
 
-
-class Scan_Type_Fast(Enum):
+class Scan_Type_Fast(IntEnum):
     """
     The scan type.
         “etalon_continuous” Etalon
@@ -55,16 +47,56 @@ class Scan_Type_Fast(Enum):
     CAVITY_TRIANGULAR = 11
     RESONATOR_TRIANGULAR = 12
 
-    @property
-    def lowercase_name(self):
-        return self.name.lower()
 
-    @classmethod
-    def has_value(cls, value):
-        return value in cls._value2member_map_
+# the protocol names of the scan types are fixed, so build them once
+for _m in Scan_Type:
+    object.__setattr__(_m, "lowercase_name", _m.name.lower())
+for _m in Scan_Type_Fast:
+    object.__setattr__(_m, "lowercase_name", _m.name.lower())
+del _m
+
+
+def _has_value_in(values):
+    # the value set is bound as a default argument so each call is a LOAD_FAST
+    def has_value(value, _values=values):
+        return value in _values
+
+    return staticmethod(has_value)
+
 
+def _from_lowercase_in(members):
+    # maps the protocol string back to its member, None if unknown
+    def from_lowercase(name, _members=members):
+        return _members.get(name)
 
-class Commands(Enum):
+    return staticmethod(from_lowercase)
+
+
+def _lowercase_name_of_in(names):
+    # maps a value to its protocol string without constructing the member, None if unknown
+    def lowercase_name_of(value, _names=names):
+        return _names.get(value)
+
+    return staticmethod(lowercase_name_of)
+
+
+Scan_Type.has_value = _has_value_in(frozenset(Scan_Type._value2member_map_))
+Scan_Type_Fast.has_value = _has_value_in(frozenset(Scan_Type_Fast._value2member_map_))
+Scan_Type.from_lowercase = _from_lowercase_in(
+    {m.lowercase_name: m for m in Scan_Type}
+)
+Scan_Type_Fast.from_lowercase = _from_lowercase_in(
+    {m.lowercase_name: m for m in Scan_Type_Fast}
+)
+Scan_Type.lowercase_name_of = _lowercase_name_of_in(
+    {m.value: m.lowercase_name for m in Scan_Type}
+)
+Scan_Type_Fast.lowercase_name_of = _lowercase_name_of_in(
+    {m.value: m.lowercase_name for m in Scan_Type_Fast}
+)
+
+
+class Commands(IntEnum):
     SET_WAVE_M = 1
     POLL_WAVE_M = 2
     LOCK_WAVE_M = 3
@@ -121,40 +153,59 @@ class Commands(Enum):
 
     @property
     def command_op(self):
-        return self.name.lower()
+        return self._op
 
     @property
     def command_op_reply(self):
-        return self.name.lower() + "_reply"
+        return self._op_reply
+
 
-    @classmethod
-    def has_value(cls, value):
-        return value in cls._value2member_map_
+# op names are fixed per member, so build them once instead of on every access
+for _m in Commands:
+    object.__setattr__(_m, "_op", _m.name.lower())
+    object.__setattr__(_m, "_op_reply", _m._op + "_reply")
+del _m
 
-    @classmethod
-    def has_command_op(cls, op):
-        return any(op == member.command_op for member in cls)
+Commands.has_value = _has_value_in(frozenset(Commands._value2member_map_))
 
-    @classmethod
-    def has_command_op_reply(cls, op):
-        return any(op == member.command_op_reply for member in cls)
+# reverse lookups from op name to command value
+_CMD_OP = {m.command_op: m.value for m in Commands}
+_CMD_OP_REPLY = {m.command_op_reply: m.value for m in Commands}
 
-    @classmethod
-    def get_value_from_op(cls, op):
-        for member in cls:
-            if member.command_op == op:
-                return member.value
-        return None
+KNOWN_OPS = frozenset(_CMD_OP)
+KNOWN_REPLIES = frozenset(_CMD_OP_REPLY)
 
-    @classmethod
-    def get_value_from_op_reply(cls, op):
-        for member in cls:
-            if member.command_op_reply == op:
-                return member.value
-        return None
 
+def _has_command_op(op, _ops=KNOWN_OPS):
+    return op in _ops
 
-status_messages_severity = dict({
+
+def _has_command_op_reply(op, _ops=KNOWN_REPLIES):
+    return op in _ops
+
+
+def _get_value_from_op(op, _ops=_CMD_OP):
+    return _ops.get(op)
+
+
+def _get_value_from_op_reply(op, _ops=_CMD_OP_REPLY):
+    return _ops.get(op)
+
+
+Commands.has_command_op = staticmethod(_has_command_op)
+Commands.has_command_op_reply = staticmethod(_has_command_op_reply)
+Commands.get_value_from_op = staticmethod(_get_value_from_op)
+Commands.get_value_from_op_reply = staticmethod(_get_value_from_op_reply)
+
+
+# status entries shared by many commands
+_OK = ("operation completed", 0)
+_OK2 = ("operation successful", 0)
+_FAIL = ("operation failed", 2)
+_CMD_FAIL = ("command failed", 2)
+_OOR = ("setting out of range", 2)
+
+status_messages_severity = {
     1: {  # set_wave_m_reply
         0: ("command successful", 0),
         1: ("no link to wavelength meter or no meter configured", 2),
@@ -170,16 +221,16 @@ status_messages_severity = dict({
         ),
     },
     3: {  # lock_wave_m_reply
-        0: ("operation successful", 0),
+        0: _OK2,
         1: ("No link to wavelength meter or no meter configured", 2),
     },
     4: {  # stop_wave_m_reply
-        0: ("operation successful", 0),
+        0: _OK2,
         1: ("No link to wavelength meter", 2),
     },
     5: {  # move_wave_t_reply
-        0: ("operation successful", 0),
-        1: ("command failed", 2),
+        0: _OK2,
+        1: _CMD_FAIL,
         2: ("wavelength out of range", 2),
     },
     6: {  # poll_move_wave_t_reply
@@ -188,73 +239,73 @@ status_messages_severity = dict({
         2: ("tuning operation failed", 2),
     },
     7: {  # stop_move_wave_t_reply
-        0: ("operation completed", 0),
+        0: _OK,
     },
     8: {  # tune_etalon_reply
-        0: ("operation completed", 0),
-        1: ("setting out of range", 2),
+        0: _OK,
+        1: _OOR,
         2: ("command failed.", 2),
     },
     9: {  # tune_cavity_reply
-        0: ("operation completed", 0),
-        1: ("setting out of range", 2),
+        0: _OK,
+        1: _OOR,
         2: ("command failed.", 2),
     },
     10: {  # fine_tune_cavity_reply
-        0: ("operation completed", 0),
-        1: ("setting out of range", 2),
+        0: _OK,
+        1: _OOR,
         2: ("command failed.", 2),
     },
     11: {  # tune_resonator
-        0: ("operation completed", 0),
-        1: ("setting out of range", 2),
+        0: _OK,
+        1: _OOR,
         2: ("command failed.", 2),
     },
     12: {  # fine_tune_resonator
-        0: ("operation completed", 0),
-        1: ("setting out of range", 2),
+        0: _OK,
+        1: _OOR,
         2: ("command failed.", 2),
     },
     13: {  # etalon_lock
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     14: {  # etalon_lock_status
-        0: ("operation completed", 0),
-        1: ("command failed", 2),
+        0: _OK,
+        1: _CMD_FAIL,
     },
     15: {  # ref_cavity_lock
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     16: {  # ref_cavity_lock_status
-        0: ("operation completed", 0),
-        1: ("command failed", 2),
+        0: _OK,
+        1: _CMD_FAIL,
     },
     17: {  # ecd_lock
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
         2: ("ecd not fitted", 2),
     },
     18: {  # ecd_lock_status
-        0: ("operation completed", 0),
-        1: ("command failed", 2),
+        0: _OK,
+        1: _CMD_FAIL,
     },
     19: {  # monitor_a
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     20: {  # monitor_b
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     21: {  # select_profile
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     22: {  # get_status
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     23: {  # get_alignment_status
         0: ("No message", 0),
@@ -273,15 +324,15 @@ status_messages_severity = dict({
         3: ("operation failed, not in manual mode", 2),
     },
     27: {  # scan_stitch_initialise
-        0: ("operation completed", 0),
+        0: _OK,
         1: ("start out of range", 2),
         2: ("stop out of range", 2),
         3: ("scan out of range", 2),
         4: ("TeraScan not available", 2),
     },
     28: {  # scan_stitch_op
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
         2: ("TeraScan not available", 2),
     },
     29: {  # scan_stitch_status
@@ -290,14 +341,14 @@ status_messages_severity = dict({
         2: ("TeraScan not available", 2),
     },
     30: {  # scan_stitch_output
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
         2: ("Unused", 0),
         3: ("TeraScan not available", 2),
     },
     31: {  # terascan_output
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
         2: ("delay period out of range", 2),
         3: ("update step out of range", 2),
         4: ("TeraScan not available", 2),
@@ -318,21 +369,21 @@ status_messages_severity = dict({
         4: ("Invalid scan type", 2),
     },
     34: {  # fast_scan_stop
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
         2: ("reference cavity not fitted", 2),
         3: ("ERC not fitted", 2),
         4: ("Invalid scan type", 2),
     },
     35: {  # fast_scan_stop_nr
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
         2: ("reference cavity not fitted", 2),
         3: ("unused", 0),
         4: ("Invalid scan type", 2),
     },
     36: {  # pba_reference
-        0: ("operation completed", 0),
+        0: _OK,
         1: ("operation failed, not fitted", 2),
     },
     37: {  # pba_reference_status
@@ -345,68 +396,86 @@ status_messages_severity = dict({
         0: ("No message", 0),
     },
     39: {  # terascan_continue
-        0: ("operation completed", 0),
+        0: _OK,
         1: ("operation failed, TeraScan was not paused", 2),
         2: ("TeraScan not available", 2),
     },
     40: {  # read_all_adc
-        0: ("operation completed", 0),
-        1: ("operation failed", 2),
+        0: _OK,
+        1: _FAIL,
     },
     41: {  # set_wave_tolerance_m
-        0: ("operation successful", 0),
+        0: _OK2,
         1: ("No link to wavelength meter or meter not configured", 2),
         2: ("Tolerance value out of range", 2),
     },
     42: {  # set_wave_lock_tolerance_m
-        0: ("operation successful", 0),
+        0: _OK2,
         1: ("No link to wavelength meter or meter not configured", 2),
         2: ("Tolerance value out of range", 2),
     },
     43: {  # digital_pid_control
-        0: ("operation successful", 0),
-        1: ("command failed", 2),
+        0: _OK2,
+        1: _CMD_FAIL,
     },
     44: {  # digital_pid_poll
-        0: ("operation successful", 0),
-        1: ("command failed", 2),
+        0: _OK2,
+        1: _CMD_FAIL,
     },
     45: {  # set_w_meter_channel
-        0: ("operation successful", 0),
-        1: ("command failed", 2),
+        0: _OK2,
+        1: _CMD_FAIL,
         2: ("channel out of range", 2),
     },
     46: {  # lock_wave_m_fixed
-        0: ("operation successful", 0),
+        0: _OK2,
         1: ("No link to wavelength meter or no meter configured", 2),
     },
     47: {  # gpio_output
-        0: ("operation successful", 0),
-        1: ("operation failed", 2),
+        0: _OK2,
+        1: _FAIL,
     },
     48: {  # dac_ramping
-        0: ("operation successful", 0),
-        1: ("operation failed", 2),
+        0: _OK2,
+        1: _FAIL,
     },
     49: {  # dac_ramping_poll
-        0: ("operation successful", 0),
-        1: ("operation failed", 2),
+        0: _OK2,
+        1: _FAIL,
     },
     50: {  # digital_pot_output
-        0: ("operation successful", 0),
-        1: ("operation failed", 2),
+        0: _OK2,
+        1: _FAIL,
     },
     51: {  # dac_output
-        0: ("operation successful", 0),
-        1: ("operation failed", 2),
+        0: _OK2,
+        1: _FAIL,
         2: ("output value out of range", 2),
     },
     100: {  # start_link_reply
-        "ok": ("operation successful", 0),
+        "ok": _OK2,
         "failed": ("failed to start link", 2),
     },
     101: {  # ping_reply
         0: ("No message", 0),
     },
-})
+}
+
+
+# flat (command value, status code) tables, a status is found with a single dict lookup
+_STATUS = {
+    (cmd, code): entry
+    for cmd, codes in status_messages_severity.items()
+    for code, entry in codes.items()
+}
+_SEVERITY = {key: severity for key, (_, severity) in _STATUS.items()}
+
+
+def status_message(cmd, code):
+    """Returns the (message, severity) tuple for the given command value and status code"""
+    return _STATUS[cmd, code]
+
 
+def severity_of(cmd, code):
+    """Returns only the severity for the given command value and status code"""
+    return _SEVERITY[cmd, code]
@@ -1,16 +1,156 @@
-import json
+import contextlib
+import itertools
+import re
 import socket
-from box import BoxList
 import string
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the standard library
+    import json
+
+    def _dumps(obj):
+        # compact like orjson, no spaces after the separators
+        return json.dumps(obj, separators=(",", ":")).encode("ascii")
+
+    _loads = json.loads
+
 from solstis_tcpip.solstis_constants import (
     Scan_Type,
     Scan_Type_Fast,
     Commands,
-    status_messages_severity,
+    status_message,
 )
 
 
+# pre-encoded framing of a command message, only the id and the parameters change per call
+_MESSAGE_HEAD = b'{"message":{"transmission_id":['
+_MESSAGE_OP = {
+    member.command_op: b'],"op":' + _dumps(member.command_op) for member in Commands
+}
+_MESSAGE_PARAMETERS = b',"parameters":'
+_MESSAGE_TAIL = b"}}"
+
+
+_TRANSMISSION_ID_MASK = (1 << 30) - 1
+
+# expected reply op for every command op
+_OP_REPLY = {member.command_op: member.command_op_reply for member in Commands}
+
+
+# (parameter, lowest, highest, error message) checked by command before a command is sent,
+# a value out of range raises ValueError
+_PARAMETER_RANGES = {
+    Commands.TUNE_ETALON: (("setting", 0, 100, "Setting out of range."),),
+    Commands.TUNE_CAVITY: (("setting", 0, 100, "Setting out of range."),),
+    Commands.FINE_TUNE_CAVITY: (("setting", 0, 100, "Setting out of range."),),
+    Commands.TUNE_RESONATOR: (("setting", 0, 100, "Setting out of range."),),
+    Commands.FINE_TUNE_RESONATOR: (("setting", 0, 100, "Setting out of range."),),
+    Commands.MONITOR_A: (("signal", 1, 16, "Signal out of range."),),
+    Commands.MONITOR_B: (("signal", 1, 16, "Signal out of range."),),
+    Commands.BEAM_ADJUST_X: (("x_value", 0, 100, "Setting out of range."),),
+    Commands.BEAM_ADJUST_Y: (("y_value", 0, 100, "Setting out of range."),),
+    Commands.SCAN_STITCH_INITIALISE: (
+        ("start", 650, 1100, "Start position out of range."),
+        ("stop", 650, 1100, "Stop position out of range."),
+    ),
+    Commands.SET_W_METER_CHANNEL: (
+        ("channel", 0, 8, "Channel out of range."),
+        ("recovery", 1, 3, "Recovery out of range."),
+    ),
+    Commands.DAC_RAMPING: (
+        ("dac_channel", 0, 31, "DAC channel out of range."),
+        ("start_stop", 1, 2, "Start/stop mode out of range."),
+        ("ramping_mode", 1, 4, "Ramping mode out of range."),
+        ("step_mode", 0, 1, "Step mode out of range."),
+    ),
+    Commands.DAC_RAMPING_POLL: (
+        ("dac_channel", 0, 31, "DAC channel out of range."),
+    ),
+    Commands.DIGITAL_POT_OUTPUT: (
+        ("channel", 0, 36, "Channel out of range."),
+        ("value", 0, 255, "Value out of range."),
+    ),
+    Commands.DAC_OUTPUT: (("channel", 0, 30, "Channel out of range."),),
+}
+
+
+def _reply_op(op):
+    """Returns the op of the reply to a command op"""
+    reply_op = _OP_REPLY.get(op)
+    if reply_op is None:
+        reply_op = op + "_reply"
+    return reply_op
+
+
+# replies are not delimited, a message ends where its outermost JSON object closes
+_RECEIVE_BUFFER_SIZE = 65536
+# kernel socket buffers, capped by net.core.rmem_max / wmem_max on Linux
+_SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+_FRAME_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}"]', re.DOTALL)
+
+
+def _find_frame(data, length):
+    """Returns (start, end) of the first complete JSON object in data[:length], end is -1 if it is incomplete"""
+    depth = 0
+    start = -1
+    for token in _FRAME_TOKEN.finditer(data, 0, length):
+        char = data[token.start()]
+        if char == 0x7B:  # {
+            if depth == 0:
+                start = token.start()
+            depth += 1
+        elif char == 0x7D:  # }
+            if depth:
+                depth -= 1
+                if depth == 0:
+                    return start, token.end()
+        elif token.end() - token.start() == 1:
+            # unterminated string, the rest of the message has not arrived yet
+            break
+    return start, -1
+
+
+def _params(**kwargs):
+    """Returns the given parameters without those that are None, or None if no parameter is left"""
+    params = {key: value for key, value in kwargs.items() if value is not None}
+    return params or None
+
+
+def _wrap_numbers(params):
+    """Returns a copy of params with each number converted to [number] to match the solstis format"""
+    if params is None:
+        return None
+    return {
+        key: [value] if isinstance(value, (int, float)) else value
+        for key, value in params.items()
+    }
+
+
+def _encode_command(transmission_id, op, params=None):
+    """Returns the JSON encoded command message as bytes"""
+    op_field = _MESSAGE_OP.get(op)
+    if op_field is None:
+        op_field = b'],"op":' + _dumps(op)
+    if params is None:
+        return b"".join(
+            (_MESSAGE_HEAD, b"%d" % transmission_id, op_field, _MESSAGE_TAIL)
+        )
+    return b"".join(
+        (
+            _MESSAGE_HEAD,
+            b"%d" % transmission_id,
+            op_field,
+            _MESSAGE_PARAMETERS,
+            _dumps(params),
+            _MESSAGE_TAIL,
+        )
+    )
+
+
 # Exception class for Solstis specific errors
 class SolstisError(Exception):
     """Exception raised when the Solstis response indicates an error
@@ -21,92 +161,146 @@ class SolstisError(Exception):
     """
 
     def __init__(self, message, severity=0):
+        super().__init__(message)
         self.message = message
-        self.severity = 0
+        self.severity = severity
 
 
 class SolstisCore:
+    __slots__ = (
+        "server_ip",
+        "server_port",
+        "connection",
+        "_transmission_id_counter",
+        "_rxbuf",
+        "_rxview",
+        "_rxlen",
+        "_batch",
+        "_unreaped",
+    )
+
     def __init__(self, server_ip, server_port):
         self.server_ip = server_ip
         self.server_port = server_port
         self.connection = None  # Placeholder for the actual connection object.
-        self.response_buffer = BoxList([])
-        self._transmission_id_counter = 0
+        self._transmission_id_counter = itertools.count(1)
+        # reusable receive buffer, bytes of a partially received reply stay in it between calls
+        self._rxbuf = bytearray(_RECEIVE_BUFFER_SIZE)
+        self._rxview = memoryview(self._rxbuf)
+        self._rxlen = 0
+        self._batch = None  # (transmission_id, op, params) queued by command_many or batch()
+        self._unreaped = []  # sent with reap=False, the replies are not read yet
 
     # Public methods to communicate with SolsTiS
     def connect(self, timeout=5.0):
+        self._rxlen = 0
+        self._unreaped = []  # replies of an earlier connection never arrive on this one
+        self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
-            self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # commands are small request/reply messages, do not let Nagle hold them back
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # set before connecting so the TCP window is negotiated with it
+            self.connection.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCKET_BUFFER_SIZE
+            )
+            self.connection.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCKET_BUFFER_SIZE
+            )
             self.connection.settimeout(timeout)  # Set a timeout of 5 seconds
             self.connection.connect((self.server_ip, self.server_port))
         except socket.timeout:
+            self.connection.close()
             self.connection = None
             raise TimeoutError("Connection timed out")
-        except Exception as e:
-            print(f"Failed to connect to the server: {e}")
+        except OSError as e:
+            self.connection.close()
             self.connection = None
+            raise ConnectionError(
+                f"Failed to connect to {self.server_ip}:{self.server_port}: {e}"
+            ) from e
 
     def send_command(self, transmission_id=1, op="start_link", params=None):
         if self.connection is None:
             raise SolstisError("Not connected to the server.", severity=10)
 
-        if params is not None:
-            # convert number to [number] to match the solstis format for each value in the params
-            for key, value in params.items():
-                if isinstance(value, (int, float)):
-                    params[key] = [value]
-
-            message = {
-                "transmission_id": [transmission_id],
-                "op": op,
-                "parameters": params,
-            }
-        else:
-            message = {"transmission_id": [transmission_id], "op": op}
-        command = {"message": message}
-        message_json = json.dumps(command)
-        print(message_json)
-        self.connection.sendall(message_json.encode('ascii'))
+        message_json = _encode_command(transmission_id, op, _wrap_numbers(params))
+        self.connection.sendall(message_json)
 
     def receive_response(self):
-        response = self.connection.recv(1024)  # Adjust the buffer size as needed.
-        self.response_buffer += BoxList([json.loads(response.decode())])
-        response_json = self.response_buffer.pop(0)
-        return response_json
+        while True:
+            frame = self._take_frame()
+            if frame is not None:
+                return _loads(frame)
+            if self._rxlen == len(self._rxbuf):
+                self._grow_receive_buffer()
+            received = self.connection.recv_into(self._rxview[self._rxlen :])
+            if received == 0:
+                raise SolstisError("Connection closed by the server.", severity=10)
+            self._rxlen += received
 
     def disconnect(self):
         if self.connection is not None:
             self.connection.close()
             self.connection = None
+        self._rxlen = 0
+        self._unreaped = []
+
+    # internal methods to manage the receive buffer
+    def _take_frame(self):
+        # cut the first complete message out of the receive buffer, None if there is none yet
+        start, end = _find_frame(self._rxbuf, self._rxlen)
+        if end < 0:
+            if start < 0:
+                self._rxlen = 0  # nothing but whitespace between messages
+            return None
+        frame = self._rxbuf[start:end]
+        remaining = self._rxlen - end
+        if remaining:
+            self._rxbuf[:remaining] = self._rxbuf[end : self._rxlen]
+        self._rxlen = remaining
+        return frame
+
+    def _grow_receive_buffer(self):
+        # a single reply is larger than the buffer, double it
+        self._rxview.release()
+        self._rxbuf.extend(bytes(len(self._rxbuf)))
+        self._rxview = memoryview(self._rxbuf)
 
     # internal methods to varify communication with SolsTiS
-    def _verify_messsage(self, message, op=None, transmission_id=None):
-        msgID = message["message"]["transmission_id"][0]
-        msgOP = message["message"]["op"]
+    def _verify_message(self, message, op=None, transmission_id=None):
+        # error messages are only formatted once a check has failed
+        msg = message["message"]
+        msgID = msg["transmission_id"][0]
+        msgOP = msg["op"]
         if msgOP == "parse_fail":
-            err_msg = "Mesage with ID " + str(msgID) + " failed to parse."
-            err_msg += "\n\n" + str(message)
-            raise SolstisError(err_msg, 10)
-        if transmission_id is not None:
-            if msgID != transmission_id:
-                err_msg = (
-                    "Message with ID"
-                    + str(msgID)
-                    + " did not match expected ID of: "
-                    + str(transmission_id)
-                )
-                raise SolstisError(err_msg, 10)
-        if op is not None:
-            if msgOP != op:
-                message = (
-                    "Message with ID"
-                    + str(msgID)
-                    + "with operation command of '"
-                    + msgOP
-                    + "' did not match expected operation command of: "
-                    + op
-                )
-                raise SolstisError(message)
+            raise SolstisError(
+                f"Message with ID {msgID} failed to parse.\n\n{message}", 10
+            )
+        if transmission_id is not None and msgID != transmission_id:
+            raise SolstisError(
+                f"Message with ID {msgID} did not match expected ID of: {transmission_id}",
+                10,
+            )
+        if op is not None and msgOP != op:
+            raise SolstisError(
+                f"Message with ID {msgID} with operation command of '{msgOP}' "
+                f"did not match expected operation command of: {op}"
+            )
+
+    def _rpc(self, transmission_id, op, params=None):
+        # one round trip: send the command and return its verified reply
+        if self._batch is not None:
+            self._batch.append((transmission_id, op, params))
+            return None
+        if self._unreaped:
+            self.drain()
+        self.send_command(transmission_id, op, params)
+        response = self.receive_response()
+        self._verify_message(
+            response, op=_reply_op(op), transmission_id=transmission_id
+        )
+        return response
 
     # Private methods to communicate with SolsTiS
     def _start_link(self, transmission_id, ip_address):
@@ -120,13 +314,7 @@ class SolstisCore:
         'ok' - The link has been successfully established.
         'failed' - The link could not be formed.
         """
-        self.send_command(transmission_id, "start_link", {"ip_address": ip_address})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="start_link_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "start_link", {"ip_address": ip_address})
 
     def _ping(self, transmission_id, text_in):
         """
@@ -138,13 +326,7 @@ class SolstisCore:
         The response from the Solstis device as a dictionary. The response includes the following fields:
         'text_out' - The echoed text with switched lower-upper case.
         """
-        self.send_command(transmission_id, "ping", {"text_in": text_in})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="ping_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "ping", {"text_in": text_in})
 
     def _set_wave_m(self, transmission_id, wavelength):
         """
@@ -164,13 +346,7 @@ class SolstisCore:
             1 - current wavelength is in an extended zone.
         'duration' - Time taken in seconds from receiving the task to transmitting the final report.
         """
-        self.send_command(transmission_id, "set_wave_m", {"wavelength": wavelength})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="set_wave_m_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "set_wave_m", {"wavelength": wavelength})
 
     def _poll_wave_m(self, transmission_id):
         """
@@ -192,13 +368,7 @@ class SolstisCore:
             0 - current wavelength is not in an extended zone.
             1 - current wavelength is in an extended zone.
         """
-        self.send_command(transmission_id, "poll_wave_m")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="poll_wave_m_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "poll_wave_m")
 
     def _lock_wave_m(self, transmission_id, operation):
         """
@@ -211,13 +381,7 @@ class SolstisCore:
         0 - operation successful.
         1 - no link to wavelength meter.
         """
-        self.send_command(transmission_id, "lock_wave_m", {"operation": operation})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="lock_wave_m_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "lock_wave_m", {"operation": operation})
 
     def _stop_wave_m(self, transmission_id):
         """
@@ -230,13 +394,7 @@ class SolstisCore:
         1 - no link to wavelength meter.
         The 'current_wavelength' field in the response is the most recently obtained wavelength reading from the wavelength meter.
         """
-        self.send_command(transmission_id, "stop_wave_m")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="stop_wave_m_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "stop_wave_m")
 
     def _move_wave_t(self, transmission_id, wavelength):
         """
@@ -250,13 +408,7 @@ class SolstisCore:
         1 - command failed.
         2 - wavelength out of range.
         """
-        self.send_command(transmission_id, "move_wave_t", {"wavelength": wavelength})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="move_wave_t_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "move_wave_t", {"wavelength": wavelength})
 
     def _poll_move_wave_t(self, transmission_id):
         """
@@ -269,13 +421,7 @@ class SolstisCore:
         1 - Tuning in progress.
         2 - Tuning operation failed.
         """
-        self.send_command(transmission_id, "poll_move_wave_t")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="poll_move_wave_t_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "poll_move_wave_t")
 
     def _stop_move_wave_t(self, transmission_id):
         """
@@ -286,13 +432,7 @@ class SolstisCore:
         The response from the Solstis device as a dictionary. The 'status' field in the response can have the following value:
         0 - operation completed.
         """
-        self.send_command(transmission_id, "stop_move_wave_t")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="stop_move_wave_t_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "stop_move_wave_t")
 
     def _tune_etalon(self, transmission_id, setting):
         """
@@ -306,13 +446,7 @@ class SolstisCore:
         1 - setting out of range.
         2 - command failed.
         """
-        self.send_command(transmission_id, "tune_etalon", {"setting": setting})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="tune_etalon_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "tune_etalon", {"setting": setting})
 
     def _tune_cavity(self, transmission_id, setting):
         """
@@ -326,13 +460,7 @@ class SolstisCore:
         1 - setting out of range.
         2 - command failed.
         """
-        self.send_command(transmission_id, "tune_cavity", {"setting": setting})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="tune_cavity_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "tune_cavity", {"setting": setting})
 
     def _fine_tune_cavity(self, transmission_id, setting):
         """
@@ -346,13 +474,7 @@ class SolstisCore:
         1 - setting out of range.
         2 - command failed.
         """
-        self.send_command(transmission_id, "fine_tune_cavity", {"setting": setting})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="fine_tune_cavity_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "fine_tune_cavity", {"setting": setting})
 
     def _tune_resonator(self, transmission_id, setting):
         """
@@ -366,13 +488,7 @@ class SolstisCore:
         1 - setting out of range.
         2 - command failed.
         """
-        self.send_command(transmission_id, "tune_resonator", {"setting": setting})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="tune_resonator_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "tune_resonator", {"setting": setting})
 
     def _fine_tune_resonator(self, transmission_id, setting):
         """
@@ -386,13 +502,7 @@ class SolstisCore:
         1 - setting out of range.
         2 - command failed.
         """
-        self.send_command(transmission_id, "fine_tune_resonator", {"setting": setting})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="fine_tune_resonator_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "fine_tune_resonator", {"setting": setting})
 
     def _etalon_lock(self, transmission_id, operation):
         """
@@ -405,13 +515,7 @@ class SolstisCore:
         0 - operation completed.
         1 - operation failed.
         """
-        self.send_command(transmission_id, "etalon_lock", {"operation": operation})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="etalon_lock_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "etalon_lock", {"operation": operation})
 
     def _etalon_lock_status(self, transmission_id):
         """
@@ -430,13 +534,7 @@ class SolstisCore:
         "search" - the lock search algorithm is active.
         "low" - the lock is off due to low output.
         """
-        self.send_command(transmission_id, "etalon_lock_status")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="etalon_lock_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "etalon_lock_status")
 
     def _cavity_lock(self, transmission_id, operation):
         """
@@ -449,13 +547,7 @@ class SolstisCore:
         0 - operation completed.
         1 - operation failed.
         """
-        self.send_command(transmission_id, "cavity_lock", {"operation": operation})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="cavity_lock_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "cavity_lock", {"operation": operation})
 
     def _cavity_lock_status(self, transmission_id):
         """
@@ -474,13 +566,7 @@ class SolstisCore:
         "search" - the lock search algorithm is active.
         "low" - the lock is off due to low output.
         """
-        self.send_command(transmission_id, "cavity_lock_status")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="cavity_lock_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "cavity_lock_status")
 
     def _ecd_lock(self, transmission_id, operation):
         """
@@ -494,13 +580,7 @@ class SolstisCore:
         1 - operation failed.
         2 - ECD not fitted.
         """
-        self.send_command(transmission_id, "ecd_lock", {"operation": operation})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="ecd_lock_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "ecd_lock", {"operation": operation})
 
     def _ecd_lock_status(self, transmission_id):
         """
@@ -520,13 +600,7 @@ class SolstisCore:
         "low" - the lock is off due to low output.
         The 'voltage' field in the response is the current ECD lock voltage.
         """
-        self.send_command(transmission_id, "ecd_lock_status")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="ecd_lock_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "ecd_lock_status")
 
     def _monitor_a(self, transmission_id, signal):
         """
@@ -555,13 +629,7 @@ class SolstisCore:
         0 - operation completed.
         1 - operation failed.
         """
-        self.send_command(transmission_id, "monitor_a", {"signal": signal})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="monitor_a_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "monitor_a", {"signal": signal})
 
     def _monitor_b(self, transmission_id, signal):
         """
@@ -590,13 +658,7 @@ class SolstisCore:
         0 - operation completed.
         1 - operation failed.
         """
-        self.send_command(transmission_id, "monitor_b", {"signal": signal})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="monitor_b_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "monitor_b", {"signal": signal})
 
     def _select_profile(self, transmission_id, profile):
         """
@@ -612,13 +674,7 @@ class SolstisCore:
         The 'max_profile' field in the response is the maximum etalon profile number configured in this system.
         The 'frequency' field in the response is the dither frequency of the selected profile in kHz.
         """
-        self.send_command(transmission_id, "select_profile", {"profile": profile})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="select_profile_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "select_profile", {"profile": profile})
 
     def _get_status(self, transmission_id):
         """
@@ -631,13 +687,7 @@ class SolstisCore:
         1 - operation failed.
         The response also includes the current wavelength, temperature, temperature status, current lock conditions for the etalon, cavity and ECD, voltages for the etalon, resonator, ECD, output monitor and etalon PD DC, and the dither status.
         """
-        self.send_command(transmission_id, "get_status")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="get_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "get_status")
 
     def _get_alignment_status(self, transmission_id):
         """
@@ -650,13 +700,7 @@ class SolstisCore:
         1 - operation failed.
         The response also includes the alignment condition, X and Y alignment values, X and Y automatic alignment values from the DSP, and the quadrant.
         """
-        self.send_command(transmission_id, "get_alignment_status")
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="get_alignment_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "get_alignment_status")
 
     def _beam_alignment(self, transmission_id, mode):
         """
@@ -673,13 +717,7 @@ class SolstisCore:
         0 - operation completed.
         1 - operation failed, not fitted.
         """
-        self.send_command(transmission_id, "beam_alignment", {"mode": mode})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="beam_alignment_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "beam_alignment", {"mode": mode})
 
     def _beam_adjust_x(self, transmission_id, x_value):
         """
@@ -694,13 +732,7 @@ class SolstisCore:
         2 - operation failed, value out of range.
         3 - operation failed, not in manual mode.
         """
-        self.send_command(transmission_id, "beam_adjust_x", {"x_value": x_value})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="beam_adjust_x_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "beam_adjust_x", {"x_value": x_value})
 
     def _beam_adjust_y(self, transmission_id, y_value):
         """
@@ -715,13 +747,7 @@ class SolstisCore:
         2 - operation failed, value out of range.
         3 - operation failed, not in manual mode.
         """
-        self.send_command(transmission_id, "beam_adjust_y", {"y_value": y_value})
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="beam_adjust_y_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "beam_adjust_y", {"y_value": y_value})
 
     def _scan_stitch_initialise(self, transmission_id, scan, start, stop, rate, units):
         """
@@ -741,17 +767,11 @@ class SolstisCore:
         3 - scan out of range.
         4 - TeraScan not available.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "scan_stitch_initialise",
             {"scan": scan, "start": start, "stop": stop, "rate": rate, "units": units},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="scan_stitch_initialise_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _scan_stitch_op(self, transmission_id, scan, operation):
         """
@@ -766,17 +786,11 @@ class SolstisCore:
         1 - operation failed.
         2 - TeraScan not available.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "scan_stitch_op",
             {"scan": scan, "operation": operation},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="scan_stitch_op_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _scan_stitch_status(self, transmission_id, scan):
         """
@@ -791,17 +805,7 @@ class SolstisCore:
         2 - TeraScan not available.
         If the status is "in progress", the response also includes the current, start, and stop wavelengths, as well as the current operation.
         """
-        self.send_command(
-            transmission_id,
-            "scan_stitch_status",
-            {"scan": scan},
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="scan_stitch_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "scan_stitch_status", {"scan": scan})
 
     def _scan_stitch_output(self, transmission_id, operation):
         """
@@ -816,17 +820,11 @@ class SolstisCore:
         2 - update rate out of range. (This field is unused.)
         3 - TeraScan not available.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "scan_stitch_output",
             {"operation": operation},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="scan_stitch_output_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _terascan_output(self, transmission_id, operation, delay, update, pause):
         """
@@ -845,17 +843,11 @@ class SolstisCore:
         3 - update step out of range.
         4 - TeraScan not available.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "terascan_output",
             {"operation": operation, "delay": delay, "update": update, "pause": pause},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="terascan_output_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _fast_scan_start(self, transmission_id, scan, width, time):
         """
@@ -874,17 +866,11 @@ class SolstisCore:
         4 - Invalid scan type.
         5 - Time > 10000 seconds.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "fast_scan_start",
             {"scan": scan, "width": width, "time": time},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="fast_scan_start_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _fast_scan_poll(self, transmission_id, scan):
         """
@@ -901,17 +887,7 @@ class SolstisCore:
         4 - Invalid scan type.
         The response also includes the current value of the tuning control for the given scan.
         """
-        self.send_command(
-            transmission_id,
-            "fast_scan_poll",
-            {"scan": scan},
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="fast_scan_poll_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "fast_scan_poll", {"scan": scan})
 
     def _fast_scan_stop(self, transmission_id, scan):
         """
@@ -927,17 +903,7 @@ class SolstisCore:
         3 - ECD not fitted.
         4 - Invalid scan type.
         """
-        self.send_command(
-            transmission_id,
-            "fast_scan_stop",
-            {"scan": scan},
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="fast_scan_stop_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "fast_scan_stop", {"scan": scan})
 
     def _fast_scan_stop_nr(self, transmission_id, scan):
         """
@@ -952,17 +918,7 @@ class SolstisCore:
         2 - Reference cavity not fitted.
         4 - Invalid scan type.
         """
-        self.send_command(
-            transmission_id,
-            "fast_scan_stop_nr",
-            {"scan": scan},
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="fast_scan_stop_nr_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "fast_scan_stop_nr", {"scan": scan})
 
     def _pba_reference(self, transmission_id, operation):
         """
@@ -975,17 +931,7 @@ class SolstisCore:
         0 - Operation completed.
         1 - Operation failed, PBA not fitted.
         """
-        self.send_command(
-            transmission_id,
-            "pba_reference",
-            {"operation": operation},
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="pba_reference_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "pba_reference", {"operation": operation})
 
     def _pba_reference_status(self, transmission_id):
         """
@@ -1000,16 +946,7 @@ class SolstisCore:
         "optimising" - The system is optimising the PBA.
         The response also includes the current X and Y alignment as percentage values, with the center being 50.
         """
-        self.send_command(
-            transmission_id,
-            "pba_reference_status",
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="pba_reference_status_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "pba_reference_status")
 
     def _get_wavelength_range(self, transmission_id):
         """
@@ -1024,16 +961,7 @@ class SolstisCore:
         - 'start_zone_N': Start wavelengths of extended zones in nanometers.
         - 'stop_zone_N': Stop wavelengths of extended zones in nanometers.
         """
-        self.send_command(
-            transmission_id,
-            "get_wavelength_range",
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="get_wavelength_range_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "get_wavelength_range")
 
     def _terascan_continue(self, transmission_id):
         """
@@ -1046,16 +974,7 @@ class SolstisCore:
         1 - Operation failed, TeraScan was not paused.
         2 - TeraScan not available.
         """
-        self.send_command(
-            transmission_id,
-            "terascan_continue",
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="terascan_continue_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "terascan_continue")
 
     def _read_all_adc(self, transmission_id, report=None):
         """
@@ -1071,18 +990,7 @@ class SolstisCore:
         - 'value_N': The current input value for the Nth ADC channel.
         - 'units_N': The measurement units for the Nth ADC channel.
         """
-        params = {"report": report} if report is not None else None
-        self.send_command(
-            transmission_id,
-            "read_all_adc",
-            params,
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="read_all_adc_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "read_all_adc", _params(report=report))
 
     def _set_wave_tolerance_m(self, transmission_id, tolerance):
         """
@@ -1096,17 +1004,11 @@ class SolstisCore:
         1 - No link to wavelength meter or meter not configured.
         2 - Tolerance value out of range.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "set_wave_tolerance_m",
             {"tolerance": tolerance},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="set_wave_tolerance_m_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _set_wave_lock_tolerance_m(self, transmission_id, tolerance):
         """
@@ -1120,19 +1022,11 @@ class SolstisCore:
         1 - No link to wavelength meter or meter not configured.
         2 - Tolerance value out of range.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "set_wave_lock_tolerance_m",
             {"tolerance": tolerance},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response,
-            op="set_wave_lock_tolerance_m_reply",
-            transmission_id=transmission_id,
-        )
-
-        return response
 
     def _digital_pid_control(self, transmission_id, operation):
         """
@@ -1145,17 +1039,11 @@ class SolstisCore:
         0 - Operation successful.
         1 - Command failed.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "digital_pid_control",
             {"operation": operation},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="digital_pid_control_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     def _digital_pid_poll(self, transmission_id):
         """
@@ -1169,16 +1057,7 @@ class SolstisCore:
         - 'target_output': The DAC value the PID loop has to maintain.
         - 'current_output': The current DAC value.
         """
-        self.send_command(
-            transmission_id,
-            "digital_pid_poll",
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="digital_pid_poll_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "digital_pid_poll")
 
     def _set_w_meter_channel(self, transmission_id, channel, recovery=None):
         """
@@ -1193,17 +1072,12 @@ class SolstisCore:
         1 - Command failed.
         2 - Channel out of range.
         """
-        params = {"channel": channel}
-        if recovery is not None:
-            params["recovery"] = recovery
-        self.send_command(transmission_id, "set_w_meter_channel", params)
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="set_w_meter_channel_reply", transmission_id=transmission_id
+        return self._rpc(
+            transmission_id,
+            "set_w_meter_channel",
+            _params(channel=channel, recovery=recovery),
         )
 
-        return response
-
     def _lock_wave_m_fixed(self, transmission_id, operation, lock_wavelength=None):
         """
         Parameters:
@@ -1216,17 +1090,12 @@ class SolstisCore:
         0 - Operation successful.
         1 - No link to wavelength meter or no meter configured.
         """
-        params = {"operation": operation}
-        if lock_wavelength is not None:
-            params["lock_wavelength"] = lock_wavelength
-        self.send_command(transmission_id, "lock_wave_m_fixed", params)
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="lock_wave_m_fixed_reply", transmission_id=transmission_id
+        return self._rpc(
+            transmission_id,
+            "lock_wave_m_fixed",
+            _params(operation=operation, lock_wavelength=lock_wavelength),
         )
 
-        return response
-
     def _gpio_output(self, transmission_id, channel, value):
         """
         Parameters:
@@ -1239,16 +1108,12 @@ class SolstisCore:
         0 - Operation successful.
         1 - Operation failed.
         """
-        self.send_command(
-            transmission_id, "gpio_output", {"channel": channel, "value": value}
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="gpio_output_reply", transmission_id=transmission_id
+        return self._rpc(
+            transmission_id,
+            "gpio_output",
+            {"channel": channel, "value": value},
         )
 
-        return response
-
     def _dac_ramping(
         self,
         transmission_id,
@@ -1288,13 +1153,7 @@ class SolstisCore:
             "update_rate": update_rate,
             "step_size": step_size,
         }
-        self.send_command(transmission_id, "dac_ramping", params)
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="dac_ramping_reply", transmission_id=transmission_id
-        )
-
-        return response
+        return self._rpc(transmission_id, "dac_ramping", params)
 
     def _dac_ramping_poll(self, transmission_id, dac_channel):
         """
@@ -1307,16 +1166,12 @@ class SolstisCore:
         0 - Operation successful.
         1 - Operation failed.
         """
-        self.send_command(
-            transmission_id, "dac_ramping_poll", {"dac_channel": dac_channel}
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="dac_ramping_poll_reply", transmission_id=transmission_id
+        return self._rpc(
+            transmission_id,
+            "dac_ramping_poll",
+            {"dac_channel": dac_channel},
         )
 
-        return response
-
     def _digital_pot_output(self, transmission_id, channel, value):
         """
         Parameters:
@@ -1329,16 +1184,12 @@ class SolstisCore:
         0 - Operation successful.
         1 - Operation failed.
         """
-        self.send_command(
-            transmission_id, "digital_pot_output", {"channel": channel, "value": value}
-        )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="digital_pot_output_reply", transmission_id=transmission_id
+        return self._rpc(
+            transmission_id,
+            "digital_pot_output",
+            {"channel": channel, "value": value},
         )
 
-        return response
-
     def _dac_output(self, transmission_id, channel, output_value):
         """
         Parameters:
@@ -1352,50 +1203,53 @@ class SolstisCore:
         1 - Operation failed.
         2 - Output value out of range.
         """
-        self.send_command(
+        return self._rpc(
             transmission_id,
             "dac_output",
             {"channel": channel, "output_value": output_value},
         )
-        response = self.receive_response()
-        self._verify_messsage(
-            response, op="dac_output_reply", transmission_id=transmission_id
-        )
-
-        return response
 
     # Private methods for internal use
     def _allocate_transmission_id(self):
-        self._transmission_id_counter += 1
-        max_transmission_id = 2**30 - 1
-        if self._transmission_id_counter > max_transmission_id:
-            self._transmission_id_counter = 0
-        return self._transmission_id_counter
+        # wraps around to 0 after the largest id of 2**30 - 1
+        return next(self._transmission_id_counter) & _TRANSMISSION_ID_MASK
+
+    def _method_of(self, command_id, kwargs):
+        # the private method of a command given by its ID or op name, after checking the ranges of kwargs
+        key = command_id
+        if isinstance(key, str):
+            key = Commands.get_value_from_op(key)
+        try:
+            method = self._command[key]
+        except KeyError:
+            raise ValueError(f"Invalid command ID. {command_id}") from None
+        ranges = _PARAMETER_RANGES.get(key)
+        if ranges is not None:
+            for name, lowest, highest, message in ranges:
+                value = kwargs.get(name)
+                if value is not None and not lowest <= value <= highest:
+                    raise ValueError(message)
+        return method
 
     def _check_response(self, response):
         # switch depending on the operation
-        operation = response["message"]["op"]
-        if "status" in response["message"]["parameters"]:
-            status = response["message"]["parameters"]["status"]
-            if type(status)!=str:
-                status=status[0]
-        else:
-            status = 0
-
-        def _handle_operation(operation, status):
-            op_index = Commands.get_value_from_op_reply(operation)
-            if Commands.has_command_op_reply(operation):
-                if status in status_messages_severity[op_index]:
-                    if status_messages_severity[op_index][status][1] != 0:
-                        raise SolstisError(*status_messages_severity[op_index][status])
-                else:
-                    raise SolstisError("Unknown error.", severity=2)
-            else:
-                print(f"Unknown operation: {operation}")
-                print(f"Status: {status}")
-                raise SolstisError("Invalid operation.", severity=2)
-
-        _handle_operation(operation, status)
+        msg = response["message"]
+        operation = msg["op"]
+        status = msg["parameters"].get("status", 0)
+        if type(status) is list:
+            status = status[0]
+
+        cmd = Commands.get_value_from_op_reply(operation)
+        if cmd is None:
+            raise SolstisError(f"Invalid operation: {operation} (status: {status})", 2)
+        try:
+            message, severity = status_message(cmd, status)
+        except KeyError:
+            raise SolstisError(
+                f"Unknown error: {operation} (status: {status})", 2
+            ) from None
+        if severity != 0:
+            raise SolstisError(message, severity)
 
     _command = {
         1: _set_wave_m,
@@ -1454,151 +1308,258 @@ class SolstisCore:
     }
 
     # Public methods, generalized call for all commands
-    def command(self, command_id, **kwargs):
+    def command(self, command_id, reap=True, **kwargs):
         """
         Parameters:
-        command_id: The ID of the command to execute.
-        transmission_id: The ID for this transmission.
+        command_id: The ID of the command to execute, or its op name e.g. "set_wave_m".
+        reap: If False, the command is sent without waiting for its reply and None is returned. The replies
+            are read and checked by drain(), or before the next command that waits for its reply.
         kwargs: The parameters to pass to the command.
 
         Returns:
         The response from the Solstis device as a dictionary.
         """
+        if not reap and self._batch is None:
+            # inside a batch() block the command is queued with the others instead
+            batch = self._queue_commands([(command_id, kwargs)])
+            self._submit(batch)
+            self._unreaped.extend(batch)
+            return None
+        method = self._method_of(command_id, kwargs)
         transmission_id = self._allocate_transmission_id()
-        assert command_id in self._command, f"Invalid command ID. {command_id}"
-        response = (self._command[command_id])(self, transmission_id, **kwargs)
+        response = method(self, transmission_id, **kwargs)
+        if self._batch is not None:
+            return None  # queued inside a batch() block
         self._check_response(response)
         return response
 
+    def command_many(self, calls):
+        """
+        Parameters:
+        calls: A list of (command_id, kwargs) tuples, command_id may also be the op name, kwargs is a dictionary of the parameters of the command.
+            All the commands are sent at once before the first reply is read, so the round trip time is paid
+            once for the whole list.
+
+        Returns:
+        The list of responses from the Solstis device, in the order of calls. The responses are checked after
+        all of them have been received, the first error is raised.
+        """
+        batch = self._queue_commands(calls)
+        return self._submit_and_reap(batch)
+
+    def drain(self):
+        """
+        Reads the replies of the commands sent with reap=False.
+
+        Returns:
+        The list of responses from the Solstis device, in the order the commands were sent. The responses are
+        checked after all of them have been received, the first error is raised.
+        """
+        batch, self._unreaped = self._unreaped, []
+        return self._reap(batch)
+
+    def pipeline(self, calls):
+        """
+        Same as command_many, the commands are given by op name.
+
+        Parameters:
+        calls: A list of (op, params) tuples, params is a dictionary of the parameters of the command or None.
+
+        Returns:
+        The list of responses from the Solstis device, in the order of calls.
+        """
+        return self.command_many([(op, params or {}) for op, params in calls])
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Queues the commands called inside the with block, they return None. All of them are sent at once
+        when the block exits, so the round trip time is paid once for the whole block. Commands called with
+        reap=False are queued and reaped with the others.
+
+        Returns:
+        A list that is filled with the responses from the Solstis device when the block exits, in the order
+        the commands were called. The responses are checked after all of them have been received, the first
+        error is raised. Nothing is sent if the block raises.
+        """
+        if self._batch is not None:
+            raise RuntimeError("batch() blocks cannot be nested.")
+        queued = self._batch = []
+        responses = []
+        try:
+            yield responses
+        finally:
+            self._batch = None
+        if queued:
+            responses.extend(self._submit_and_reap(queued))
+
+    # internal methods to send several commands before reading their replies
+    def _queue_commands(self, calls):
+        # the private command methods only queue their message while a batch is open
+        outer, self._batch = self._batch, []
+        try:
+            for command_id, kwargs in calls:
+                method = self._method_of(command_id, kwargs)
+                method(self, self._allocate_transmission_id(), **kwargs)
+            return self._batch
+        finally:
+            self._batch = outer
+
+    def _submit(self, batch):
+        # batch is a list of (transmission_id, op, params)
+        if self.connection is None:
+            raise SolstisError("Not connected to the server.", severity=10)
+        self.connection.sendall(
+            b"".join(
+                _encode_command(transmission_id, op, _wrap_numbers(params))
+                for transmission_id, op, params in batch
+            )
+        )
+
+    def _submit_and_reap(self, batch):
+        # like _rpc, the replies of the unreaped commands are read before anything new is sent,
+        # an error in one of them is raised before the batch goes out
+        if self._unreaped:
+            self.drain()
+        self._submit(batch)
+        return self._reap(batch)
+
+    def _reap(self, batch):
+        # the replies are matched by transmission id, they may come back in any order. Every expected
+        # reply is read before an error is raised, so no reply is left on the socket for the next command
+        position = {call[0]: index for index, call in enumerate(batch)}
+        responses = [None] * len(batch)
+        stray = None
+        while position:
+            response = self.receive_response()
+            msgID = response["message"]["transmission_id"][0]
+            index = position.pop(msgID, None)
+            if index is not None:
+                responses[index] = response
+                continue
+            # a parse_fail reply does not tell which command it answers, stop reading here
+            self._verify_message(response)
+            if stray is None:
+                stray = msgID
+        if stray is not None:
+            raise SolstisError(
+                f"Message with ID {stray} did not match any expected ID.", 10
+            )
+        for response, (transmission_id, op, _) in zip(responses, batch):
+            self._verify_message(
+                response, op=_reply_op(op), transmission_id=transmission_id
+            )
+            self._check_response(response)
+        return responses
+
     # Public methods, specific call for each command
     def start_link(self, ip_address: str = "192.168.1.107"):
         """
         Parameters:
         ip_address: The IP address of the client.
         """
-        kw_args = {"ip_address": ip_address}
-        return self.command(100, **kw_args)
+        return self.command(100, ip_address=ip_address)
 
     def ping(self, text_in: str):
         """
         Parameters:
         text_in: The text to be echoed back with switched lower-upper case.
         """
-        kw_args = {"text_in": text_in}
-        return self.command(101, **kw_args)
+        return self.command(101, text_in=text_in)
 
     def set_wave_m(self, wavelength: float):
         """
         Parameters:
         wavelength: The target wavelength value in nm within the tuning range of the SolsTiS.
         """
-        kw_args = {"wavelength": wavelength}
         # the parameter of extended_zone is not used in the current version
-        return self.command(1, **kw_args)
+        return self.command(1, wavelength=wavelength)
 
     def poll_wave_m(self):
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(2, **kw_args)
+        return self.command(2)
 
     def lock_wave_m(self, operation: bool):
         """
         Parameters:
         operation: The operation to perform. Can be True to maintain the current wavelength or False to stop maintaining it.
         """
-        kw_args = {"operation": "on" if operation else "off"}
-        return self.command(3, **kw_args)
+        return self.command(3, operation="on" if operation else "off")
 
     def stop_wave_m(self):
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(4, **kw_args)
+        return self.command(4)
 
     def move_wave_t(self, wavelength: float):
         """
         Parameters:
         wavelength: The target wavelength in nm within the tuning range of the SolsTiS.
         """
-        kw_args = {"wavelength": wavelength}
-        return self.command(5, **kw_args)
+        return self.command(5, wavelength=wavelength)
 
     def poll_move_wave_t(self):
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(6, **kw_args)
+        return self.command(6)
 
     def stop_move_wave_t(self):
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(7, **kw_args)
+        return self.command(7)
 
     def tune_etalon(self, setting: float):
         """
         Parameters:
         setting: The etalon tuning setting, expressed as a percentage where 100 is full scale.
         """
-        assert 0 <= setting <= 100, "Setting out of range."
-        kw_args = {"setting": setting}
-        return self.command(8, **kw_args)
+        return self.command(8, setting=setting)
 
     def tune_cavity(self, setting: float):
         """
         Parameters:
         setting: The reference cavity tuning setting, expressed as a percentage where 100 is full scale.
         """
-        assert 0 <= setting <= 100, "Setting out of range."
-        kw_args = {"setting": setting}
-        return self.command(9, **kw_args)
+        return self.command(9, setting=setting)
 
     def fine_tune_cavity(self, setting: float):
         """
         Parameters:
         setting: The fine reference cavity tuning setting, expressed as a percentage where 100 is full scale.
         """
-        assert 0 <= setting <= 100, "Setting out of range."
-        kw_args = {"setting": setting}
-        return self.command(10, **kw_args)
+        return self.command(10, setting=setting)
 
     def tune_resonator(self, setting: float):
         """
         Parameters:
         setting: The resonator tuning setting, expressed as a percentage where 100 is full scale.
         """
-        assert 0 <= setting <= 100, "Setting out of range."
-        kw_args = {"setting": setting}
-        return self.command(11, **kw_args)
+        return self.command(11, setting=setting)
 
     def fine_tune_resonator(self, setting: float):
         """
         Parameters:
         setting: The fine resonator tuning setting, expressed as a percentage where 100 is full scale.
         """
-        assert 0 <= setting <= 100, "Setting out of range."
-        kw_args = {"setting": setting}
-        return self.command(12, **kw_args)
+        return self.command(12, setting=setting)
 
     def etalon_lock(self, operation: bool):
         """
         Parameters:
         operation: The operation to perform. Can be True to apply the lock or False to remove it.
         """
-        kw_args = {"operation": "on" if operation else "off"}
-        return self.command(13, **kw_args)
+        return self.command(13, operation="on" if operation else "off")
 
     def etalon_lock_status(self):
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(14, **kw_args)
+        return self.command(14)
 
     def cavity_lock(self, operation: bool):
         """
@@ -1606,8 +1567,7 @@ class SolstisCore:
         operation: The operation to perform. Can be True to apply the lock or False to remove it.
         """
 
-        kw_args = {"operation": "on" if operation else "off"}
-        return self.command(15, **kw_args)
+        return self.command(15, operation="on" if operation else "off")
 
     def cavity_lock_status(
         self,
@@ -1615,8 +1575,7 @@ class SolstisCore:
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(16, **kw_args)
+        return self.command(16)
 
     def ecd_lock(self, operation: bool):
         """
@@ -1624,8 +1583,7 @@ class SolstisCore:
         operation: The operation to perform. Can be True to apply the lock or False to remove it.
         """
 
-        kw_args = {"operation": "on" if operation else "off"}
-        return self.command(17, **kw_args)
+        return self.command(17, operation="on" if operation else "off")
 
     def ecd_lock_status(
         self,
@@ -1633,8 +1591,7 @@ class SolstisCore:
         """
         Parameters: None
         """
-        kw_args = {}
-        return self.command(18, **kw_args)
+        return self.command(18)
 
     def monitor_a(self, signal: int):
         """
@@ -1656,9 +1613,7 @@ class SolstisCore:
         15 - Etalon PD AC
         16 - Output_PD
         """
-        assert 1 <= signal <= 16, "Signal out of range."
-        kw_args = {"signal": signal}
-        return self.command(19, **kw_args)
+        return self.command(19, signal=signal)
 
     def monitor_b(self, signal: int):
         """
@@ -1680,17 +1635,14 @@ class SolstisCore:
         15 - Etalon PD AC
         16 - Output_PD
         """
-        assert 1 <= signal <= 16, "Signal out of range."
-        kw_args = {"signal": signal}
-        return self.command(20, **kw_args)
+        return self.command(20, signal=signal)
 
     def select_profile(self, profile: int):
         """
         Parameters:
         1 – 5 Each system can have up to 5 defined etalon profiles.
         """
-        kw_args = {"profile": profile}
-        return self.command(21, **kw_args)
+        return self.command(21, profile=profile)
 
     def get_status(
         self,
@@ -1699,8 +1651,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(22, **kw_args)
+        return self.command(22)
 
     def get_alignment_status(
         self,
@@ -1709,8 +1660,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(23, **kw_args)
+        return self.command(23)
 
     def beam_alignment(self, mode: int):
         """
@@ -1721,26 +1671,21 @@ class SolstisCore:
         3 - Stop (and hold current values)
         4 - One shot
         """
-        kw_args = {"mode": mode}
-        return self.command(24, **kw_args)
+        return self.command(24, mode=mode)
 
     def beam_adjust_x(self, x_value: float):
         """
         Parameters:
         x value: 0 – 100 - X alignment percentage value, centre = 50
         """
-        assert 0 <= x_value <= 100, "Setting out of range."
-        kw_args = {"x_value": x_value}
-        return self.command(25, **kw_args)
+        return self.command(25, x_value=x_value)
 
     def beam_adjust_y(self, y_value: float):
         """
         Parameters:
         y value: 0 – 100 - Y alignment percentage value, centre = 50
         """
-        assert 0 <= y_value <= 100, "Setting out of range."
-        kw_args = {"y_value": y_value}
-        return self.command(26, **kw_args)
+        return self.command(26, y_value=y_value)
 
     def scan_stitch_initialise(
         self, scan: int, start: float, stop: float, rate: float, units: str
@@ -1768,19 +1713,15 @@ class SolstisCore:
                 “MHz/s” - fine and line narrow scans only.
                 “kHz/s” - line narrow scans only.
         """
-        assert Scan_Type.has_value(scan), "Scan type not valid."
-        assert unit in ["GHz/s", "MHz/s", "kHz/s"], "Units not valid."
-        assert 650 <= start <= 1100, "Start position out of range."
-        assert 650 <= stop <= 1100, "Stop position out of range."
+        scan_name = Scan_Type.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
+        if units not in ("GHz/s", "MHz/s", "kHz/s"):
+            raise ValueError("Units not valid.")
 
-        kw_args = {
-            "scan": Scan_Type(scan).lowercase_name,
-            "start": start,
-            "stop": stop,
-            "rate": rate,
-            "units": units,
-        }
-        return self.command(27, **kw_args)
+        return self.command(
+            27, scan=scan_name, start=start, stop=stop, rate=rate, units=units
+        )
 
     def scan_stitch_op(self, scan: int, operation: bool):
         """
@@ -1790,23 +1731,24 @@ class SolstisCore:
             “start” - Start running the given scan
             “stop” - Stop running the given scan
         """
-        assert Scan_Type.has_value(scan), "Scan type not valid."
+        scan_name = Scan_Type.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
 
-        kw_args = {
-            "scan": Scan_Type(scan).lowercase_name,
-            "operation": "start" if operation else "stop",
-        }
-        return self.command(28, **kw_args)
+        return self.command(
+            28, scan=scan_name, operation="start" if operation else "stop"
+        )
 
     def scan_stitch_status(self, scan: int):
         """
         Parameters:
         Scan type : see Enum
         """
-        assert Scan_Type.has_value(scan), "Scan type not valid."
+        scan_name = Scan_Type.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
 
-        kw_args = {"scan": Scan_Type(scan).lowercase_name}
-        return self.command(29, **kw_args)
+        return self.command(29, scan=scan_name)
 
     def scan_stitch_output(self, operation: bool):
         """
@@ -1815,12 +1757,71 @@ class SolstisCore:
             “start” - Start running the given scan
             “stop” - Stop running the given scan
         """
-        assert type(operation) == bool, "Operation not valid."
+        if not isinstance(operation, bool):
+            raise ValueError("Operation not valid.")
+
+        return self.command(30, operation="start" if operation else "stop")
+
+    def start_terascan(
+        self, scan: int, start: float, stop: float, rate: float, units: str
+    ):
+        """
+        Initialises the scan, starts it and starts its output with a single round trip,
+        see scan_stitch_initialise for the parameters.
+
+        The start commands are sent without waiting for the initialise result. If the device rejects the
+        initialisation, they still run with the previous scan configuration, and the error is only raised
+        once all three replies have been read. Call scan_stitch_initialise first, then scan_stitch_op and
+        scan_stitch_output, when the scan must not start on a rejected configuration.
+
+        Returns:
+        The list of the scan_stitch_initialise, scan_stitch_op and scan_stitch_output responses.
+        """
+        scan_name = Scan_Type.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
+        if units not in ("GHz/s", "MHz/s", "kHz/s"):
+            raise ValueError("Units not valid.")
 
-        kw_args = {"operation": "start" if operation else "stop"}
-        return self.command(30, **kw_args)
+        initialise_args = {
+            "scan": scan_name,
+            "start": start,
+            "stop": stop,
+            "rate": rate,
+            "units": units,
+        }
+        return self.command_many(
+            [
+                (27, initialise_args),
+                (28, {"scan": scan_name, "operation": "start"}),
+                (30, {"operation": "start"}),
+            ]
+        )
 
-    def terascan_output(self, operation: bool, delay: float, update: float, units: str):
+    def stop_terascan(self, scan: int):
+        """
+        Stops the scan and its output with a single round trip.
+
+        Parameters:
+        Scan type : see Enum
+
+        Returns:
+        The list of the scan_stitch_op and scan_stitch_output responses.
+        """
+        scan_name = Scan_Type.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
+
+        return self.command_many(
+            [
+                (28, {"scan": scan_name, "operation": "stop"}),
+                (30, {"operation": "stop"}),
+            ]
+        )
+
+    def terascan_output(
+        self, operation: bool, delay: float, update: float, pause: bool = False
+    ):
         """
         Parameters:
             Operation
@@ -1850,13 +1851,13 @@ class SolstisCore:
                 segment.
                 “off” - TeraScan will not pause at the start of any segments
         """
-        kw_args = {
-            "operation": "start" if operation else "stop",
-            "delay": delay,
-            "update": update,
-            "units": units,
-        }
-        return self.command(31, **kw_args)
+        return self.command(
+            31,
+            operation="start" if operation else "stop",
+            delay=delay,
+            update=update,
+            pause="on" if pause else "off",
+        )
 
     def fast_scan_start(self, scan: int, width: float, time: float):
         """
@@ -1865,50 +1866,44 @@ class SolstisCore:
             width
             time
         """
-        assert Scan_Type_Fast.has_value(scan), "Scan type not valid."
+        scan_name = Scan_Type_Fast.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
 
-        kw_args = {
-            "scan": Scan_Type_Fast(scan).lowercase_name,
-            "width": width,
-            "time": time,
-        }
-        return self.command(32, **kw_args)
+        return self.command(32, scan=scan_name, width=width, time=time)
 
     def fast_scan_poll(self, scan: int):
         """
         Parameters:
             Scan type
         """
-        assert Scan_Type_Fast.has_value(scan), "Scan type not valid."
+        scan_name = Scan_Type_Fast.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
 
-        kw_args = {
-            "scan": Scan_Type_Fast(scan).lowercase_name,
-        }
-        return self.command(33, **kw_args)
+        return self.command(33, scan=scan_name)
 
     def fast_scan_stop(self, scan: int):
         """
         Parameters:
             Scan type
         """
-        assert Scan_Type_Fast.has_value(scan), "Scan type not valid."
+        scan_name = Scan_Type_Fast.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
 
-        kw_args = {
-            "scan": Scan_Type_Fast(scan).lowercase_name,
-        }
-        return self.command(34, **kw_args)
+        return self.command(34, scan=scan_name)
 
     def fast_scan_stop_nr(self, scan: int):
         """
         Parameters:
             Scan type
         """
-        assert Scan_Type_Fast.has_value(scan), "Scan type not valid."
+        scan_name = Scan_Type_Fast.lowercase_name_of(scan)
+        if scan_name is None:
+            raise ValueError("Scan type not valid.")
 
-        kw_args = {
-            "scan": Scan_Type_Fast(scan).lowercase_name,
-        }
-        return self.command(35, **kw_args)
+        return self.command(35, scan=scan_name)
 
     def pba_reference(self, operation: bool):
         """
@@ -1917,10 +1912,10 @@ class SolstisCore:
             “start” - Start
             “stop” - Stop
         """
-        assert type(operation) == bool, "Operation not valid."
+        if not isinstance(operation, bool):
+            raise ValueError("Operation not valid.")
 
-        kw_args = {"operation": "start" if operation else "stop"}
-        return self.command(36, **kw_args)
+        return self.command(36, operation="start" if operation else "stop")
 
     def pba_reference_status(
         self,
@@ -1929,8 +1924,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(37, **kw_args)
+        return self.command(37)
 
     def get_wavelength_range(
         self,
@@ -1939,8 +1933,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(38, **kw_args)
+        return self.command(38)
 
     def terascan_continue(
         self,
@@ -1949,8 +1942,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(39, **kw_args)
+        return self.command(39)
 
     def read_all_adc(
         self,
@@ -1959,8 +1951,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(40, **kw_args)
+        return self.command(40)
 
     def set_wave_tolerance_m(self, tolerance):
         """
@@ -1985,8 +1976,7 @@ class SolstisCore:
             0.00000001 – 1.0 (meter accurate to 7 decimal places)
         """
 
-        kw_args = {"tolerance": tolerance}
-        return self.command(41, **kw_args)
+        return self.command(41, tolerance=tolerance)
 
     def set_wave_lock_tolerance_m(self, tolerance):
         """
@@ -1999,8 +1989,7 @@ class SolstisCore:
             0.00000001 – 0.005 (meter accurate to 7 decimal places)
         """
 
-        kw_args = {"tolerance": tolerance}
-        return self.command(42, **kw_args)
+        return self.command(42, tolerance=tolerance)
 
     def digital_pid_control(self, operation: bool):
         """
@@ -2009,10 +1998,10 @@ class SolstisCore:
             “start” - Start
             “stop” - Stop
         """
-        assert type(operation) == bool, "Operation not valid."
+        if not isinstance(operation, bool):
+            raise ValueError("Operation not valid.")
 
-        kw_args = {"operation": "start" if operation else "stop"}
-        return self.command(43, **kw_args)
+        return self.command(43, operation="start" if operation else "stop")
 
     def digital_pid_poll(
         self,
@@ -2021,8 +2010,7 @@ class SolstisCore:
         Parameters: None
         """
 
-        kw_args = {}
-        return self.command(44, **kw_args)
+        return self.command(44)
 
     def set_w_meter_channel(self, channel: int, recovery: int):
         """
@@ -2032,11 +2020,7 @@ class SolstisCore:
         recovery
             1 - 3
         """
-        assert 0 <= channel <= 8, "Channel out of range."
-        assert 1 <= recovery <= 3, "Recovery out of range."
-
-        kw_args = {"channel": channel, "recovery": recovery}
-        return self.command(45, **kw_args)
+        return self.command(45, channel=channel, recovery=recovery)
 
     def lock_wave_m_fixed(self, operation: bool):
         """
@@ -2044,21 +2028,22 @@ class SolstisCore:
         Operation
             "on" or "off"
         """
-        assert type(operation) == bool, "Operation not valid."
+        if not isinstance(operation, bool):
+            raise ValueError("Operation not valid.")
 
-        kw_args = {"operation": "on" if operation else "off"}
-        return self.command(46, **kw_args)
+        return self.command(46, operation="on" if operation else "off")
 
-    def gpio_output(self, channel: int, value: bool):
+    def gpio_output(self, channel: int, value: bool, reap: bool = True):
         """
         Parameters:
         Channel
             0 - 31
         value
             0 or 1
+        reap
+            False to send without waiting for the reply, see command()
         """
-        kw_args = {"channel": channel, "value": 1 if value else 0}
-        return self.command(47, **kw_args)
+        return self.command(47, channel=channel, value=1 if value else 0, reap=reap)
 
     def dac_ramping(
         self,
@@ -2070,6 +2055,7 @@ class SolstisCore:
         ramp_rate: float,
         update_rate: float,
         step_size: float,
+        reap: bool = True,
     ):
         """
         DAC channel number
@@ -2095,6 +2081,8 @@ class SolstisCore:
         The time for the required update in seconds.
         Step size
         Step size in user units.
+        Reap
+        False to send without waiting for the reply, see command()
         Status value
         0 - operation successful.
         1 - operation failed
@@ -2102,58 +2090,47 @@ class SolstisCore:
         Expected Time
         The time it will take to complete the task in seconds.
         """
-        assert 0 <= dac_channel <= 31, "DAC channel out of range."
-        assert 1 <= start_stop <= 2, "Start/stop mode out of range."
-        assert 1 <= ramping_mode <= 4, "Ramping mode out of range."
-        assert 0 <= step_mode <= 1, "Step mode out of range."
-
-        kw_args = {
-            "dac_channel": dac_channel,
-            "start_stop": start_stop,
-            "ramping_mode": ramping_mode,
-            "step_mode": step_mode,
-            "target_output": target_output,
-            "ramp_rate": ramp_rate,
-            "update_rate": update_rate,
-            "step_size": step_size,
-        }
-
-        return self.command(48, **kw_args)
+        return self.command(
+            48,
+            dac_channel=dac_channel,
+            start_stop=start_stop,
+            ramping_mode=ramping_mode,
+            step_mode=step_mode,
+            target_output=target_output,
+            ramp_rate=ramp_rate,
+            update_rate=update_rate,
+            step_size=step_size,
+            reap=reap,
+        )
 
-    def dac_ramping_poll(self, dac_rampping_channel: int):
+    def dac_ramping_poll(self, dac_channel: int):
         """
         Parameters:
         DAC channel number
             0 - 31
         """
-        assert 0 <= dac_rampping_channel <= 31, "DAC channel out of range."
-
-        kw_args = {"dac_rampping_channel": dac_rampping_channel}
-        return self.command(49, **kw_args)
+        return self.command(49, dac_channel=dac_channel)
 
-    def digital_pot_output(self, channel: int, value: int):
+    def digital_pot_output(self, channel: int, value: int, reap: bool = True):
         """
         Parameters:
         Channel
             0 - 36
         value
             0 - 255
+        reap
+            False to send without waiting for the reply, see command()
         """
-        assert 0 <= channel <= 36, "Channel out of range."
-        assert 0 <= value <= 255, "Value out of range."
+        return self.command(50, channel=channel, value=value, reap=reap)
 
-        kw_args = {"channel": channel, "value": value}
-        return self.command(50, **kw_args)
-
-    def dac_output(self, channel: int, output_value: float):
+    def dac_output(self, channel: int, output_value: float, reap: bool = True):
         """
         Parameters:
         Channel
             0 - 30
         output_value
             unknown
+        reap
+            False to send without waiting for the reply, see command()
         """
-        assert 0 <= channel <= 30, "Channel out of range."
-
-        kw_args = {"channel": channel, "output_value": output_value}
-        return self.command(51, **kw_args)
+        return self.command(51, channel=channel, output_value=output_value, reap=reap)
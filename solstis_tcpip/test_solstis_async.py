@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import json
+
+import pytest
+
+from solstis_tcpip.solstis_async import AsyncSolstisCore
+from solstis_tcpip.solstis_core import SolstisError, _find_frame
+
+
+def reply_to(message, **parameters):
+    return {
+        "message": {
+            "transmission_id": message["transmission_id"],
+            "op": message["op"] + "_reply",
+            "parameters": parameters,
+        }
+    }
+
+
+def serve(reply, group=1, reverse=False):
+    """Returns a server coroutine that answers every command with reply(message)
+
+    The replies are written once group commands have arrived, in reverse order if reverse is set.
+    """
+
+    async def handle(reader, writer):
+        data = b""
+        messages = []
+        while True:
+            chunk = await reader.read(4096)
+            if not chunk:
+                break
+            data += chunk
+            while True:
+                start, end = _find_frame(data, len(data))
+                if end < 0:
+                    break
+                messages.append(json.loads(data[start:end])["message"])
+                data = data[end:]
+            while len(messages) >= group:
+                answered, messages = messages[:group], messages[group:]
+                for message in reversed(answered) if reverse else answered:
+                    writer.write(json.dumps(reply(message)).encode())
+            await writer.drain()
+        writer.close()
+
+    return handle
+
+
+@contextlib.asynccontextmanager
+async def connected_client(handler):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    solstis = AsyncSolstisCore(server_ip="127.0.0.1", server_port=port)
+    await solstis.connect()
+    try:
+        yield solstis
+    finally:
+        await solstis.disconnect()
+        server.close()
+        await server.wait_closed()
+
+
+def test_async_poll_until():
+    # answer every command with status 0 and a wavelength that grows per poll
+    wavelengths = iter(range(500, 600))
+
+    def reply(message):
+        if message["op"] == "start_link":
+            return reply_to(message, status="ok")
+        return reply_to(message, status=[0], current_wavelength=[next(wavelengths)])
+
+    async def run():
+        async with connected_client(serve(reply)) as solstis:
+            await solstis.start_link(ip_address="127.0.0.1")
+            return await solstis.poll_until(
+                6,
+                lambda r: r["message"]["parameters"]["current_wavelength"][0] >= 503,
+                interval=0,
+                timeout=5,
+            )
+
+    response = asyncio.run(run())
+    assert response["message"]["parameters"]["current_wavelength"] == [503]
+    assert response["message"]["transmission_id"] == [5]
+
+
+def test_async_concurrent_commands():
+    # the replies to the two pings come back in reverse order
+    def reply(message):
+        return reply_to(message, text_out=message["parameters"]["text_in"].swapcase())
+
+    async def run():
+        async with connected_client(serve(reply, group=2, reverse=True)) as solstis:
+            return await asyncio.gather(
+                solstis.ping(text_in="first"), solstis.ping(text_in="second")
+            )
+
+    first, second = asyncio.run(run())
+    assert first["message"]["parameters"]["text_out"] == "FIRST"
+    assert second["message"]["parameters"]["text_out"] == "SECOND"
+
+
+def test_async_settle_wavelength():
+    # poll_wave_m reports tuning in progress until the third poll
+    polls = [([2], [500.0]), ([2], [505.0]), ([3], [509.99])]
+
+    def reply(message):
+        if message["op"] == "poll_wave_m":
+            status, wavelength = polls.pop(0) if len(polls) > 1 else polls[0]
+            return reply_to(
+                message,
+                status=status,
+                current_wavelength=wavelength,
+                lock_status=[0],
+                extended_zone=[0],
+            )
+        return reply_to(
+            message, status=[0], current_wavelength=[500.0], extended_zone=[0]
+        )
+
+    async def run():
+        async with connected_client(serve(reply)) as solstis:
+            return await solstis.settle_wavelength(
+                510.0, 0.05, interval=0, timeout=5
+            )
+
+    response = asyncio.run(run())
+    assert response["message"]["parameters"]["current_wavelength"] == [509.99]
+    assert response["message"]["transmission_id"] == [4]
+
+
+def test_async_command_without_reap():
+    def reply(message):
+        return reply_to(message, status=[0])
+
+    async def run():
+        async with connected_client(serve(reply)) as solstis:
+            # checked before the task is created, like in SolstisCore
+            with pytest.raises(ValueError):
+                await solstis.command(8, reap=False, setting=150)
+            with pytest.raises(ValueError):
+                await solstis.command("no_such_op", reap=False)
+            assert await solstis.command(8, reap=False, setting=40) is None
+            assert await solstis.command(11, reap=False, setting=60) is None
+            return await solstis.drain()
+
+    responses = asyncio.run(run())
+    assert [r["message"]["transmission_id"] for r in responses] == [[1], [2]]
+
+
+def test_async_unmatched_reply():
+    # the waiting commands fail instead of waiting forever
+    def reply(message):
+        if message["op"] == "ping":
+            return {"message": {"transmission_id": [0], "op": "parse_fail", "parameters": {}}}
+        return reply_to(message, status=[0])
+
+    async def run():
+        async with connected_client(serve(reply)) as solstis:
+            with pytest.raises(SolstisError) as excinfo:
+                await asyncio.wait_for(solstis.ping(text_in="a"), 5)
+            return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.severity == 10
+
+
+def test_async_batch():
+    def reply(message):
+        return reply_to(message, status=[0])
+
+    async def run():
+        async with connected_client(serve(reply, group=2, reverse=True)) as solstis:
+            async with solstis.batch() as responses:
+                assert await solstis.tune_etalon(setting=40) is None
+                assert await solstis.tune_resonator(setting=60) is None
+                assert responses == []
+            with pytest.raises(KeyError):
+                async with solstis.batch():
+                    await solstis.tune_etalon(setting=40)
+                    raise KeyError
+            return responses
+
+    responses = asyncio.run(run())
+    assert [r["message"]["op"] for r in responses] == ["tune_etalon_reply", "tune_resonator_reply"]
@@ -1,8 +1,14 @@
+import pytest
+
 from solstis_tcpip.solstis_constants import (
     Scan_Type,
     Scan_Type_Fast,
     Commands,
+    KNOWN_OPS,
+    KNOWN_REPLIES,
     status_messages_severity,
+    status_message,
+    severity_of,
 )
 
 
@@ -23,3 +29,65 @@ def test_status_messages_severity_severity_classify():
         assert any(
             severity == 0 for _, severity in value.values()
         ), f"Severity 0 not found in subvalues, key: {key}, value: {value}"
+
+
+def test_commands_op_lookup():
+    for member in Commands:
+        assert Commands.has_value(member.value)
+        assert Commands.has_command_op(member.command_op)
+        assert Commands.has_command_op_reply(member.command_op_reply)
+        assert member.command_op in KNOWN_OPS
+        assert member.command_op_reply in KNOWN_REPLIES
+        assert Commands.get_value_from_op(member.command_op) == member.value
+        assert Commands.get_value_from_op_reply(member.command_op_reply) == member.value
+
+    assert not Commands.has_value(0)
+    assert Scan_Type.has_value(4) and not Scan_Type.has_value(5)
+    assert Scan_Type_Fast.has_value(12) and not Scan_Type_Fast.has_value(13)
+    assert not Commands.has_command_op("unknown_op")
+    assert Commands.get_value_from_op("unknown_op") is None
+    assert Commands.get_value_from_op_reply("unknown_op_reply") is None
+
+
+def test_status_message_matches_table():
+    for cmd, codes in status_messages_severity.items():
+        for code, entry in codes.items():
+            assert status_message(cmd, code) == entry
+            assert severity_of(cmd, code) == entry[1]
+
+    with pytest.raises(KeyError):
+        status_message(1, 99)
+    with pytest.raises(KeyError):
+        status_message(37, "unknown")
+    assert status_message(Commands.SET_WAVE_M, 0) == status_messages_severity[1][0]
+    for cmd, code in ((1, -1), (-1, 0), ("1", 0)):
+        with pytest.raises(KeyError):
+            status_message(cmd, code)
+        with pytest.raises(KeyError):
+            severity_of(cmd, code)
+
+
+def test_scan_type_coarse_alias():
+    assert Scan_Type.COURSE is Scan_Type.COARSE
+    assert Scan_Type(1).lowercase_name == "coarse"
+
+
+def test_scan_type_from_lowercase():
+    for member in Scan_Type:
+        assert Scan_Type.from_lowercase(member.lowercase_name) is member
+    for member in Scan_Type_Fast:
+        assert Scan_Type_Fast.from_lowercase(member.lowercase_name) is member
+
+    assert Scan_Type.from_lowercase("course") is None
+    assert Scan_Type_Fast.from_lowercase("ETALON_SINGLE") is None
+
+
+def test_scan_type_lowercase_name_of():
+    for member in Scan_Type:
+        assert Scan_Type.lowercase_name_of(member.value) == member.lowercase_name
+    for member in Scan_Type_Fast:
+        assert Scan_Type_Fast.lowercase_name_of(member) == member.lowercase_name
+
+    assert Scan_Type.lowercase_name_of(1) == "coarse"
+    assert Scan_Type.lowercase_name_of(5) is None
+    assert Scan_Type_Fast.lowercase_name_of(0) is None
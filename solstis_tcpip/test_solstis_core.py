@@ -1,12 +1,51 @@
+import itertools
+import json
+import socket
+import threading
+
 import pytest
-from box import BoxList
 
-from solstis_tcpip.solstis_core import SolstisCore, SolstisError
-from solstis_tcpip.solstis_constants import Commands
+from solstis_tcpip.solstis_core import (
+    SolstisCore,
+    SolstisError,
+    _encode_command,
+    _reply_op,
+    _wrap_numbers,
+)
+from solstis_tcpip.solstis_constants import Commands, Scan_Type
 from solstis_tcpip.utils import response_keys
 
 
+# parameters of the dummy reply for each operation
+_MOCK_REPLIES = {
+    "start_link": {"status": "ok"},
+    "set_wave_m": {"status": [0], "current_wavelength": [500], "extended_zone": 0},
+    "poll_wave_m": {
+        "status": [3],
+        "current_wavelength": [500],
+        "lock_status": 0,
+        "extended_zone": 0,
+    },
+    "lock_wave_m": {"status": [0]},
+    "stop_wave_m": {"status": [0], "current_wavelength": [500]},
+    "move_wave_t": {"status": [0]},
+    "poll_move_wave_t": {"status": [0], "current_wavelength": [500]},
+    "stop_move_wave_t": {"status": [0]},
+    "tune_etalon": {"status": [0]},
+    "tune_cavity": {"status": [0]},
+    "fine_tune_cavity": {"status": [0]},
+    "tune_resonator": {"status": [0]},
+    "fine_tune_resonator": {"status": [0]},
+}
+# replies that depend on the parameters of the command
+_MOCK_REPLY_FUNCS = {
+    "ping": lambda params: {"text_out": params["text_in"].swapcase()},
+}
+
+
 class MockSolstisCore(SolstisCore):
+    __slots__ = ("last_message_received",)
+
     def __init__(self, server_ip, server_port):
         # Use __init__ of SolstisCore to set up the connection
         super().__init__(server_ip, server_port)
@@ -22,14 +61,10 @@ class MockSolstisCore(SolstisCore):
 
 
         if params is not None:
-            # convert number to [number] to match the solstis format for each value in the params
-            for key, value in params.items():
-                if isinstance(value, (int, float)):
-                    params[key] = [value]
             message = {
                 "transmission_id": [transmission_id],
                 "op": op,
-                "parameters": params,
+                "parameters": _wrap_numbers(params),
             }
         else:
             message = {"transmission_id": [transmission_id], "op": op}
@@ -37,100 +72,76 @@ class MockSolstisCore(SolstisCore):
         self.last_message_received = command
 
     def create_dummy_response(self):
-        transmission_id = self.last_message_received["message"]["transmission_id"][0]
-        op = self.last_message_received["message"]["op"]
-        if "parameters" in self.last_message_received["message"]:
-            params = self.last_message_received["message"]["parameters"]
-        else:
-            params = None
-
-        op_reply = op + "_reply"
-        if op == "start_link":
-            params_ret = {
-                "status": "ok",
-            }
-        elif op == "ping":
-            params_ret = {
-                "text_out": params["text_in"].swapcase(),
-            }
-        elif op == "set_wave_m":
-            params_ret = {
-                "status": [0],
-                "current_wavelength": [500],
-                "extended_zone": 0,
-            }
-        elif op == "poll_wave_m":
-            params_ret = {
-                "status": [3],
-                "current_wavelength": [500],
-                "lock_status": 0,
-                "extended_zone": 0,
-            }
-        elif op == "lock_wave_m":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "stop_wave_m":
-            params_ret = {
-                "status": [0],
-                "current_wavelength": [500],
-            }
-        elif op == "move_wave_t":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "poll_move_wave_t":
-            params_ret = {
-                "status": [0],
-                "current_wavelength": [500],
-            }
-        elif op == "stop_move_wave_t":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "tune_etalon":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "tune_cavity":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "fine_tune_cavity":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "tune_resonator":
-            params_ret = {
-                "status": [0],
-            }
-        elif op == "fine_tune_resonator":
-            params_ret = {
-                "status": [0],
-            }
+        message = self.last_message_received["message"]
+        op = message["op"]
+        reply_func = _MOCK_REPLY_FUNCS.get(op)
+        if reply_func is not None:
+            params_ret = reply_func(message["parameters"])
+        elif op in _MOCK_REPLIES:
+            params_ret = dict(_MOCK_REPLIES[op])
         else:
             raise ValueError("Unknown operation: " + op)
 
-        message = {
-            "transmission_id": [transmission_id],
-            "op": op_reply,
-            "parameters": params_ret,
+        return {
+            "message": {
+                "transmission_id": message["transmission_id"],
+                "op": _reply_op(op),
+                "parameters": params_ret,
+            }
         }
 
-        response = {"message": message}
-        print(response)
-        return response
-
     def receive_response(self):
-        response = self.create_dummy_response()
-        self.response_buffer += BoxList([response])
-        response_json = self.response_buffer.pop(0)
-        return response_json
+        return self.create_dummy_response()
 
     def disconnect(self):
         self.connection = None
 
 
+def reply_message(transmission_id, op, **parameters):
+    # reply of the Solstis device to op, the parameters default to a successful status
+    return {
+        "message": {
+            "transmission_id": [transmission_id],
+            "op": _reply_op(op),
+            "parameters": parameters or {"status": [0]},
+        }
+    }
+
+
+def send_replies(server, *replies):
+    server.sendall(b"".join(json.dumps(reply).encode() for reply in replies))
+
+
+def encoded(*calls):
+    # the bytes the client writes for the given (transmission_id, op, params) calls
+    return b"".join(_encode_command(*call) for call in calls)
+
+
+def assert_nothing_sent(server):
+    server.setblocking(False)
+    with pytest.raises(BlockingIOError):
+        server.recv(4096)
+    server.setblocking(True)
+
+
+@pytest.fixture
+def socketpair_client():
+    # SolstisCore connected to one end of a socket pair, the test plays the device on the other end
+    pairs = []
+
+    def connect(*replies):
+        solstis = SolstisCore(server_ip="192.000.0.000", server_port=12345)
+        solstis.connection, server = socket.socketpair()
+        send_replies(server, *replies)
+        pairs.append((solstis, server))
+        return solstis, server
+
+    yield connect
+    for solstis, server in pairs:
+        server.close()
+        solstis.disconnect()
+
+
 def test_mock_solstiscore1():
     # Test that the dummy connection reporesent the real connection of server (Default movement)
     solstis = MockSolstisCore(server_ip="192.000.0.000", server_port=12345)
@@ -243,3 +254,297 @@ def test_solstiscore1():
     assert (
         _command_keys == enum_values
     ), "Keys in the dictionary do not match the values in the enum"
+
+
+def test_check_response():
+    solstis = SolstisCore(server_ip="192.000.0.000", server_port=12345)
+
+    def reply(op, status):
+        return {"message": {"transmission_id": [1], "op": op, "parameters": {"status": status}}}
+
+    solstis._check_response(reply("set_wave_m_reply", [0]))
+    solstis._check_response(reply("poll_wave_m_reply", [3]))
+    solstis._check_response(reply("start_link_reply", "ok"))
+
+    with pytest.raises(SolstisError) as excinfo:
+        solstis._check_response(reply("set_wave_m_reply", [2]))
+    assert excinfo.value.severity == 2
+    assert str(excinfo.value) == excinfo.value.message
+    with pytest.raises(SolstisError) as excinfo:
+        solstis._check_response(reply("poll_wave_m_reply", [2]))
+    assert excinfo.value.severity == 1
+    with pytest.raises(SolstisError):
+        solstis._check_response(reply("start_link_reply", "failed"))
+    with pytest.raises(SolstisError, match=r"set_wave_m_reply \(status: 99\)"):
+        solstis._check_response(reply("set_wave_m_reply", [99]))
+    with pytest.raises(SolstisError, match=r"unknown_reply \(status: 0\)"):
+        solstis._check_response(reply("unknown_reply", [0]))
+
+
+def test_command_by_op_name():
+    solstis = MockSolstisCore(server_ip="192.000.0.000", server_port=12345)
+    solstis.connect()
+    response = solstis.command("ping", text_in="HelloWorld")
+    assert response["message"]["parameters"]["text_out"] == "hELLOwORLD"
+    response = solstis.command("set_wave_m", wavelength=500)
+    assert response["message"]["op"] == "set_wave_m_reply"
+    with pytest.raises(ValueError):
+        solstis.command("unknown_op")
+    with pytest.raises(ValueError):
+        solstis.command(0)
+    solstis.disconnect()
+
+
+def test_command_parameter_ranges():
+    # checked for the generic command as well as for the specific methods
+    solstis = MockSolstisCore(server_ip="192.000.0.000", server_port=12345)
+    solstis.connect()
+    with pytest.raises(ValueError):
+        solstis.command(8, setting=150)
+    with pytest.raises(ValueError):
+        solstis.tune_resonator(setting=-1)
+    with pytest.raises(ValueError):
+        solstis.command("monitor_a", signal=17)
+    with pytest.raises(ValueError):
+        solstis.scan_stitch_status(scan=5)
+    with pytest.raises(ValueError):
+        solstis.pba_reference(operation="start")
+    solstis.tune_etalon(setting=100)
+    solstis.disconnect()
+
+
+def test_encode_command():
+    assert json.loads(_encode_command(7, "poll_wave_m")) == {
+        "message": {"transmission_id": [7], "op": "poll_wave_m"}
+    }
+    assert json.loads(_encode_command(8, "tune_etalon", {"setting": [50]})) == {
+        "message": {
+            "transmission_id": [8],
+            "op": "tune_etalon",
+            "parameters": {"setting": [50]},
+        }
+    }
+    # ops outside of Commands are still encoded
+    assert json.loads(_encode_command(9, "custom_op"))["message"]["op"] == "custom_op"
+
+
+def test_receive_response_framing():
+    # replies may arrive split over several reads or packed into one
+    solstis = SolstisCore(server_ip="192.000.0.000", server_port=12345)
+    solstis.connection, server = socket.socketpair()
+
+    first = {"message": {"transmission_id": [1], "op": "ping_reply", "parameters": {"text_out": "a}{\\\"b"}}}
+    # larger than the initial receive buffer
+    second = {"message": {"transmission_id": [2], "op": "get_status_reply", "parameters": {"status": [0], "text": "x" * 100000}}}
+    data = json.dumps(first).encode() + json.dumps(second).encode()
+
+    def send():
+        server.sendall(data[:10])
+        server.sendall(data[10:])
+
+    sender = threading.Thread(target=send)
+    sender.start()
+    assert solstis.receive_response() == first
+    assert solstis.receive_response() == second
+    sender.join()
+
+    server.close()
+    with pytest.raises(SolstisError):
+        solstis.receive_response()
+    solstis.disconnect()
+
+
+def test_allocate_transmission_id_wraps():
+    solstis = SolstisCore(server_ip="192.000.0.000", server_port=12345)
+    assert solstis._allocate_transmission_id() == 1
+    assert solstis._allocate_transmission_id() == 2
+
+    solstis._transmission_id_counter = itertools.count(2**30 - 1)
+    assert solstis._allocate_transmission_id() == 2**30 - 1
+    assert solstis._allocate_transmission_id() == 0
+    assert solstis._allocate_transmission_id() == 1
+
+
+def test_pipeline(socketpair_client):
+    # all commands go out in one write, the replies come back packed together and out of order
+    replies = [
+        reply_message(1, "set_wave_m", status=[0], current_wavelength=[500], extended_zone=[0]),
+        reply_message(2, "poll_wave_m", status=[3], current_wavelength=[500], lock_status=[1], extended_zone=[0]),
+    ]
+    solstis, server = socketpair_client(*reversed(replies))
+
+    responses = solstis.pipeline([("set_wave_m", {"wavelength": 500}), ("poll_wave_m", None)])
+    assert responses == replies
+    assert server.recv(4096) == encoded((1, "set_wave_m", {"wavelength": [500]}), (2, "poll_wave_m"))
+
+    # validated like command_many, nothing is sent
+    with pytest.raises(ValueError):
+        solstis.pipeline([("tune_etalon", {"setting": 150})])
+    with pytest.raises(ValueError):
+        solstis.pipeline([("no_such_op", None)])
+    assert_nothing_sent(server)
+
+
+def test_connect_refused():
+    # a port nobody listens on
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+
+    solstis = SolstisCore(server_ip="127.0.0.1", server_port=port)
+    with pytest.raises(ConnectionError):
+        solstis.connect(timeout=1.0)
+    assert solstis.connection is None
+
+
+def test_command_many(socketpair_client):
+    replies = [reply_message(1, "tune_etalon"), reply_message(2, "tune_resonator")]
+    solstis, server = socketpair_client(*replies)
+
+    assert solstis.command_many([(8, {"setting": 40}), (11, {"setting": 60})]) == replies
+    assert server.recv(4096) == encoded((1, "tune_etalon", {"setting": [40]}), (2, "tune_resonator", {"setting": [60]}))
+
+    # back to one round trip per command afterwards
+    send_replies(server, reply_message(3, "ping", text_out="A"))
+    assert solstis.ping(text_in="a")["message"]["parameters"]["text_out"] == "A"
+
+
+def test_wrap_numbers():
+    params = {"wavelength": 780.0, "operation": "on", "channel": [1]}
+    assert _wrap_numbers(params) == {"wavelength": [780.0], "operation": "on", "channel": [1]}
+    assert params == {"wavelength": 780.0, "operation": "on", "channel": [1]}  # not modified
+    assert _wrap_numbers(None) is None
+
+
+def test_reap_reads_every_reply(socketpair_client):
+    # unreaped replies out of order
+    solstis, server = socketpair_client(reply_message(2, "tune_resonator"), reply_message(1, "tune_etalon"))
+    solstis.command(8, reap=False, setting=40)
+    solstis.command(11, reap=False, setting=60)
+    assert solstis.drain() == [reply_message(1, "tune_etalon"), reply_message(2, "tune_resonator")]
+
+    # a reply nobody waits for is raised once the expected ones have been read
+    send_replies(server, reply_message(99, "tune_etalon"), reply_message(4, "tune_resonator"), reply_message(3, "tune_etalon"))
+    with pytest.raises(SolstisError, match="ID 99 did not match any expected ID"):
+        solstis.command_many([(8, {"setting": 40}), (11, {"setting": 60})])
+
+    server.recv(4096)
+    send_replies(server, reply_message(5, "tune_etalon"))
+    assert solstis.tune_etalon(setting=60) == reply_message(5, "tune_etalon")
+
+    # a parse_fail reply does not tell which command failed, it is raised at once
+    parse_fail = {"message": {"transmission_id": [0], "op": "parse_fail", "parameters": {}}}
+    send_replies(server, parse_fail)
+    with pytest.raises(SolstisError, match="failed to parse") as excinfo:
+        solstis.command_many([(8, {"setting": 40}), (11, {"setting": 60})])
+    assert excinfo.value.severity == 10
+
+
+def test_batch(socketpair_client):
+    replies = [reply_message(1, "tune_etalon"), reply_message(2, "tune_resonator")]
+    solstis, server = socketpair_client(*reversed(replies))
+
+    with solstis.batch() as responses:
+        assert solstis.tune_etalon(setting=40) is None
+        assert solstis.command(11, reap=False, setting=60) is None
+        assert_nothing_sent(server)  # nothing is sent inside the block
+    assert responses == replies
+    assert server.recv(4096) == encoded((1, "tune_etalon", {"setting": [40]}), (2, "tune_resonator", {"setting": [60]}))
+
+    with pytest.raises(RuntimeError):
+        with solstis.batch():
+            with solstis.batch():
+                pass
+
+    # a block that raises sends nothing
+    with pytest.raises(KeyError):
+        with solstis.batch():
+            solstis.tune_etalon(setting=40)
+            raise KeyError
+    assert_nothing_sent(server)
+
+
+def test_command_without_reap(socketpair_client):
+    solstis, server = socketpair_client()
+
+    assert solstis.dac_output(channel=0, output_value=1.5, reap=False) is None
+    assert solstis.gpio_output(channel=1, value=True, reap=False) is None
+    assert server.recv(4096) == encoded(
+        (1, "dac_output", {"channel": [0], "output_value": [1.5]}), (2, "gpio_output", {"channel": [1], "value": [1]})
+    )
+
+    replies = [reply_message(1, "dac_output"), reply_message(2, "gpio_output")]
+    send_replies(server, *replies)
+    assert solstis.drain() == replies
+    assert solstis.drain() == []
+
+    # a command waiting for its reply drains the unreaped ones first
+    solstis.dac_output(channel=0, output_value=2.5, reap=False)
+    server.recv(4096)
+    send_replies(server, reply_message(3, "dac_output", status=[1]))
+    with pytest.raises(SolstisError) as excinfo:
+        solstis.ping(text_in="a")
+    assert excinfo.value.message == "operation failed"
+    assert_nothing_sent(server)  # the ping itself was not sent
+
+    # the same for command_many, a failed unreaped reply is raised before the new commands are sent
+    solstis.command(11, reap=False, setting=10)
+    server.recv(4096)
+    send_replies(server, reply_message(5, "tune_resonator", status=[1]))
+    with pytest.raises(SolstisError):
+        solstis.command_many([(11, {"setting": 20})])
+    assert_nothing_sent(server)
+    send_replies(server, reply_message(7, "tune_etalon"))
+    assert solstis.tune_etalon(setting=60) == reply_message(7, "tune_etalon")
+
+    # replies still unread when the connection closes are not waited for on the next one
+    solstis.dac_output(channel=0, output_value=0.5, reap=False)
+    solstis.disconnect()
+    solstis.connection, server = socket.socketpair()
+    assert solstis.drain() == []
+    server.close()
+
+
+def test_start_terascan(socketpair_client):
+    replies = [reply_message(1, "scan_stitch_initialise"), reply_message(2, "scan_stitch_op"), reply_message(3, "scan_stitch_output")]
+    solstis, server = socketpair_client(*replies)
+
+    assert solstis.start_terascan(Scan_Type.MEDIUM, 700, 710, 10, "GHz/s") == replies
+    assert server.recv(4096) == encoded(
+        (1, "scan_stitch_initialise", {"scan": "medium", "start": [700], "stop": [710], "rate": [10], "units": "GHz/s"}),
+        (2, "scan_stitch_op", {"scan": "medium", "operation": "start"}),
+        (3, "scan_stitch_output", {"operation": "start"}),
+    )
+
+    # a rejected initialisation is raised after all three replies have been read
+    send_replies(
+        server,
+        reply_message(4, "scan_stitch_initialise", status=[2]),
+        reply_message(5, "scan_stitch_op"),
+        reply_message(6, "scan_stitch_output"),
+    )
+    with pytest.raises(SolstisError, match="stop out of range"):
+        solstis.start_terascan(Scan_Type.MEDIUM, 700, 710, 10, "GHz/s")
+    server.recv(4096)
+    send_replies(server, reply_message(7, "tune_etalon"))
+    assert solstis.tune_etalon(setting=60) == reply_message(7, "tune_etalon")
+
+
+def test_scan_wrapper_parameters(socketpair_client):
+    # the wrappers send the parameter names the private command methods expect
+    replies = [reply_message(1, "scan_stitch_initialise"), reply_message(2, "terascan_output"), reply_message(3, "dac_ramping_poll")]
+    solstis, server = socketpair_client(*replies)
+
+    assert solstis.scan_stitch_initialise(Scan_Type.FINE, 700, 710, 5, "MHz/s") == replies[0]
+    assert solstis.terascan_output(True, 10, 5, pause=True) == replies[1]
+    assert solstis.dac_ramping_poll(dac_channel=3) == replies[2]
+    assert server.recv(4096) == encoded(
+        (1, "scan_stitch_initialise", {"scan": "fine", "start": [700], "stop": [710], "rate": [5], "units": "MHz/s"}),
+        (2, "terascan_output", {"operation": "start", "delay": [10], "update": [5], "pause": "on"}),
+        (3, "dac_ramping_poll", {"dac_channel": [3]}),
+    )
+    with pytest.raises(ValueError):
+        solstis.scan_stitch_initialise(Scan_Type.FINE, 700, 710, 5, "Hz/s")
+    with pytest.raises(ValueError):
+        solstis.dac_ramping_poll(dac_channel=32)
@@ -1,32 +1,28 @@
+# keys of the response parameters for each operation, as frozensets for quick membership tests
+_RESPONSE_KEYS = {
+    op: frozenset(keys)
+    for op, keys in {
+        "start_link": ("status",),
+        "ping": ("text_out",),
+        "set_wave_m": ("status", "current_wavelength", "extended_zone"),
+        "poll_wave_m": ("status", "current_wavelength", "lock_status", "extended_zone"),
+        "lock_wave_m": ("status",),
+        "stop_wave_m": ("status", "current_wavelength"),
+        "move_wave_t": ("status",),
+        "poll_move_wave_t": ("status", "current_wavelength"),
+        "stop_move_wave_t": ("status",),
+        "tune_etalon": ("status",),
+        "tune_cavity": ("status",),
+        "fine_tune_cavity": ("status",),
+        "tune_resonator": ("status",),
+        "fine_tune_resonator": ("status",),
+    }.items()
+}
+
+
 def response_keys(op):
     """Returns the keys of the response dictionary for the given operation"""
-    if op == "start_link":
-        return ["status"]
-    elif op == "ping":
-        return ["text_out"]
-    elif op == "set_wave_m":
-        return ["status", "current_wavelength", "extended_zone"]
-    elif op == "poll_wave_m":
-        return ["status", "current_wavelength", "lock_status", "extended_zone"]
-    elif op == "lock_wave_m":
-        return ["status"]
-    elif op == "stop_wave_m":
-        return ["status", "current_wavelength"]
-    elif op == "move_wave_t":
-        return ["status"]
-    elif op == "poll_move_wave_t":
-        return ["status", "current_wavelength"]
-    elif op == "stop_move_wave_t":
-        return ["status"]
-    elif op == "tune_etalon":
-        return ["status"]
-    elif op == "tune_cavity":
-        return ["status"]
-    elif op == "fine_tune_cavity":
-        return ["status"]
-    elif op == "tune_resonator":
-        return ["status"]
-    elif op == "fine_tune_resonator":
-        return ["status"]
-    else:
-        raise ValueError("Unknown operation: " + op)
+    try:
+        return _RESPONSE_KEYS[op]
+    except KeyError:
+        raise ValueError("Unknown operation: " + op) from None